@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the Intcode engines.
+
+Runs the programs of days 5, 7 and 9 and synthetic stress programs, and
+reports how many instructions per second the engine executes and how much
+memory each run needs at most. The results are compared against the
+baseline stored in `baseline.json`, and the script exits with status 1 if
+any case got slower or needs more memory than the tolerance of the metric
+allows. Timings are noisy, so speed has a much wider tolerance than peak
+memory, and the speed of cases running for less than MIN_SECONDS isn't
+compared at all.
+
+    python3 benchmarks/benchmark.py [--engine ENGINE] [--repeat N] [--save]
+        [--speed-tolerance FRACTION] [--memory-tolerance FRACTION]
+
+`--save` stores the results as the new baseline for the engine. Baselines
+depend on the machine they were measured on. A change that moves a metric
+beyond its tolerance on purpose regenerates the baseline with `--save` for
+the engines it affects and explains the change in its commit message.
+"""
+from typing import Callable, Dict, List
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+DIR_PATH = os.path.dirname(os.path.realpath(__file__))
+ROOT_PATH = os.path.dirname(DIR_PATH)
+sys.path.insert(0, ROOT_PATH)
+
+from intcode import Machine, amplifiers, execute, execute_blocks, execute_compiled, execute_table, read_intcode_program
+from intcode.profiler import Profile
+
+
+BASELINE_PATH = DIR_PATH + '/baseline.json'
+
+# Fractions by which a result may be worse than its baseline
+SPEED_TOLERANCE = 0.4
+MEMORY_TOLERANCE = 0.1
+
+# Cases running for a shorter time are too noisy to compare their speed
+MIN_SECONDS = 0.01
+
+ENGINES = {
+    'execute': execute,
+    'table': execute_table,
+    'blocks': execute_blocks,
+    'compiled': execute_compiled,
+}
+
+
+def load_day_module(day: int, part: int):
+    path = '{}/day-{}/day-{}-{}.py'.format(ROOT_PATH, day, day, part)
+    spec = importlib.util.spec_from_file_location('day_{}_{}'.format(day, part), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def countdown_program(count: int) -> List[int]:
+    """
+    A tight loop decrementing a counter until it reaches 0.
+
+    >>> Machine(countdown_program(3)).run()
+    [0]
+    """
+    return [
+        1101, count, 0, 14,  # counter = count
+        1001, 14, -1, 14,    # counter -= 1
+        1005, 14, 4,         # loop while counter != 0
+        4, 14,               # output counter
+        99,
+        0,                   # counter
+    ]
+
+
+def recursion_program(depth: int) -> List[int]:
+    """
+    Computes depth + (depth - 1) + ... + 0 recursively, with one stack frame
+    of return address, argument and result per call on the relative base.
+
+    >>> Machine(recursion_program(10)).run()
+    [55]
+    """
+    return [
+        109, 48,              # rb = stack
+        21101, depth, 0, 1,   # [rb + 1] = depth
+        21101, 13, 0, 0,      # [rb + 0] = return address
+        1105, 1, 16,          # call sum
+        204, 2,               # output [rb + 2]
+        99,
+        # sum: [rb + 2] = [rb + 1] + sum([rb + 1] - 1)
+        1206, 1, 41,          # if [rb + 1] == 0 goto base
+        109, 3,               # rb += 3
+        21201, -2, -1, 1,     # [rb + 1] = [rb - 2] - 1
+        21101, 32, 0, 0,      # [rb + 0] = return address
+        1105, 1, 16,          # call sum
+        109, -3,              # rb -= 3
+        22201, 1, 5, 2,       # [rb + 2] = [rb + 1] + [rb + 5]
+        2106, 0, 0,           # return
+        # base:
+        21101, 0, 0, 2,       # [rb + 2] = 0
+        2106, 0, 0,           # return
+    ]
+
+
+def multiplication_program(count: int) -> List[int]:
+    """
+    Multiplies a value by 3 `count` times, which takes it far beyond 64 bits.
+
+    >>> Machine(multiplication_program(50)).run() == [3 ** 50]
+    True
+    """
+    return [
+        1101, 1, 0, 22,       # value = 1
+        1101, count, 0, 23,   # counter = count
+        1002, 22, 3, 22,      # value *= 3
+        1001, 23, -1, 23,     # counter -= 1
+        1005, 23, 8,          # loop while counter != 0
+        4, 22,                # output value
+        99,
+        0, 0,                 # value, counter
+    ]
+
+
+def get_cases() -> Dict[str, tuple]:
+    """
+    Returns the benchmark cases by name. Each case is a function running
+    it with a given engine and the result it must return.
+    """
+    day_5_intcode = load_day_module(5, 2).puzzle_intcode
+    day_7_intcode = read_intcode_program(ROOT_PATH + '/day-7/intcode-program.txt')
+    day_9_intcode = read_intcode_program(ROOT_PATH + '/day-9/intcode-program.txt')
+
+    def run(intcode, input_values=()):
+        return lambda engine: Machine(intcode, input_values, engine).run()
+
+    return {
+        'day-5-1': (run(day_5_intcode, [1]), [0] * 9 + [5346030]),
+        'day-5-2': (run(day_5_intcode, [5]), [513116]),
+        'day-7-1': (lambda engine: amplifiers.find_max_thruster_signal(
+            day_7_intcode, range(5), engine=engine)[0], 398674),
+        'day-7-2': (lambda engine: amplifiers.find_max_thruster_signal(
+            day_7_intcode, range(5, 10), feedback=True, engine=engine)[0], 39431233),
+        'day-9-1': (run(day_9_intcode, [1]), [3013554615]),
+        'day-9-2': (run(day_9_intcode, [2]), [50158]),
+        'countdown': (run(countdown_program(100000)), [0]),
+        'recursion': (run(recursion_program(20000)), [20000 * 20001 // 2]),
+        'multiplication': (run(multiplication_program(20000)), [3 ** 20000]),
+    }
+
+
+def measure(case: Callable, expected, engine, repeat: int) -> dict:
+    """
+    Runs a case and returns the instructions it executes, the best of
+    `repeat` wall times, the resulting instructions per second and the
+    peak memory allocated while running it.
+    """
+    profile = Profile()
+    if case(profile.execute) != expected:
+        raise Exception('WRONG RESULT')
+
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = case(engine)
+        elapsed = time.perf_counter() - started
+
+        if result != expected:
+            raise Exception('WRONG RESULT')
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    case(engine)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'instructions': profile.instructions,
+        'seconds': best,
+        'instructions_per_second': profile.instructions / best,
+        'peak_memory': peak_memory,
+    }
+
+
+def compare(results: dict, baseline: dict, speed_tolerance: float, memory_tolerance: float) -> List[str]:
+    """
+    Returns descriptions of the results that are worse than their baseline
+    by more than the tolerance of the metric.
+
+    >>> compare({'a': {'instructions_per_second': 50, 'peak_memory': 100, 'seconds': 1}},
+    ...         {'a': {'instructions_per_second': 100, 'peak_memory': 100, 'seconds': 0.5}}, 0.4, 0.1)
+    ['a: 50 instructions/s, baseline 100']
+    >>> compare({'a': {'instructions_per_second': 70, 'peak_memory': 120, 'seconds': 1}},
+    ...         {'a': {'instructions_per_second': 100, 'peak_memory': 100, 'seconds': 0.7}}, 0.4, 0.1)
+    ['a: 120 bytes peak memory, baseline 100']
+    >>> compare({'a': {'instructions_per_second': 50, 'peak_memory': 100, 'seconds': 0.002}},
+    ...         {'a': {'instructions_per_second': 100, 'peak_memory': 100, 'seconds': 0.001}}, 0.4, 0.1)
+    []
+    """
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        expected = baseline[name]
+        timed = max(result['seconds'], expected['seconds']) >= MIN_SECONDS
+
+        if timed and result['instructions_per_second'] < expected['instructions_per_second'] * (1 - speed_tolerance):
+            regressions.append('{}: {:.0f} instructions/s, baseline {:.0f}'.format(
+                name, result['instructions_per_second'], expected['instructions_per_second']))
+
+        if result['peak_memory'] > expected['peak_memory'] * (1 + memory_tolerance):
+            regressions.append('{}: {} bytes peak memory, baseline {}'.format(
+                name, result['peak_memory'], expected['peak_memory']))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the Intcode engines.')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='execute')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--speed-tolerance', type=float, default=SPEED_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--save', action='store_true', help='store the results as new baseline')
+    parser.add_argument('cases', nargs='*', help='names of the cases to run (default: all)')
+    arguments = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r') as file:
+            baselines = json.load(file)
+
+    baseline = baselines.get(arguments.engine, {})
+    results = {}
+
+    print('{:<16} {:>12} {:>10} {:>14} {:>14} {:>10}'.format(
+        'case', 'instructions', 'seconds', 'instructions/s', 'peak memory', 'baseline'))
+
+    for name, (case, expected) in get_cases().items():
+        if arguments.cases and name not in arguments.cases:
+            continue
+
+        result = results[name] = measure(case, expected, ENGINES[arguments.engine], arguments.repeat)
+        change = ''
+        if name in baseline:
+            change = '{:+.1%}'.format(result['instructions_per_second'] / baseline[name]['instructions_per_second'] - 1)
+
+        print('{:<16} {:>12} {:>10.4f} {:>14.0f} {:>14} {:>10}'.format(
+            name, result['instructions'], result['seconds'], result['instructions_per_second'],
+            result['peak_memory'], change))
+
+    if arguments.save:
+        baselines[arguments.engine] = dict(baseline, **results)
+
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write('\n')
+
+        return
+
+    regressions = compare(results, baseline, arguments.speed_tolerance, arguments.memory_tolerance)
+
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    main()
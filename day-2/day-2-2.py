@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 
-OPCODE_ADD = 1
-OPCODE_MULTIPLY = 2
-OPCODE_HALT = 99
+import os
+import sys
+
+DIR_PATH = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(DIR_PATH))
+
+from intcode import Machine, batch, solver
 
 
 puzzle_intcode = [
@@ -12,49 +16,41 @@ puzzle_intcode = [
 puzzle_output_value = 19690720
 
 
-def process_intcode_segment(intcode, index):
-    opcode = intcode[index]
-
-    if opcode == OPCODE_HALT:
-        return
-
-    input_1_index = intcode[index + 1]
-    input_2_index = intcode[index + 2]
-    output_index = intcode[index + 3]
-
-    if opcode == OPCODE_ADD:
-        intcode[output_index] = intcode[input_1_index] + intcode[input_2_index]
-    elif opcode == OPCODE_MULTIPLY:
-        intcode[output_index] = intcode[input_1_index] * intcode[input_2_index]
-    else:
-        raise Exception('A very bad thing happened.')
-
-
-def process_intcode(intcode):
-    intcode_copy = intcode.copy()
-
-    for index in range(0, len(intcode_copy), 4):
-        if intcode_copy[index] == OPCODE_HALT:
-            break
-
-        process_intcode_segment(intcode_copy, index)
-
-    return intcode_copy
-
-
-def find_noun_verb_combination(intcode, target_output_value):
+def find_noun_verb_combination(intcode, target_output_value, symbolic=True, vectorized=True):
     """
+    Solves for noun and verb symbolically if the program allows it. Otherwise,
+    all combinations are executed in one NumPy batch, or one after another
+    if that isn't possible either.
+
     >>> find_noun_verb_combination(puzzle_intcode, puzzle_output_value)
     (62, 55)
+    >>> find_noun_verb_combination(puzzle_intcode, puzzle_output_value, symbolic=False)
+    (62, 55)
+    >>> find_noun_verb_combination(puzzle_intcode, puzzle_output_value, symbolic=False, vectorized=False)
+    (62, 55)
     """
+    if symbolic:
+        try:
+            return solver.solve_noun_verb(intcode, target_output_value)
+        except solver.SymbolicExecutionError:
+            pass
+
+    if vectorized:
+        try:
+            return batch.search_noun_verb(intcode, target_output_value)
+        except (ImportError, batch.BatchExecutionError):
+            pass
+
+    program = Machine(intcode)
+
     for noun in range(0, 100):
         for verb in range(0, 100):
-            intcode_copy = intcode.copy()
-            intcode_copy[1] = noun
-            intcode_copy[2] = verb
+            machine = program.fork()
+            machine.memory[1] = noun
+            machine.memory[2] = verb
+            machine.run()
 
-            opcode_result = process_intcode(intcode_copy)
-            if opcode_result[0] == target_output_value:
+            if machine.memory[0] == target_output_value:
                 return noun, verb
 
 
@@ -1,66 +1,13 @@
 #!/usr/bin/env python3
 
 from typing import List, Tuple
-import itertools
+import os
+import sys
 
+DIR_PATH = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(DIR_PATH))
 
-OPCODE_ADD = '01'
-OPCODE_MULTIPLY = '02'
-OPCODE_INPUT = '03'
-OPCODE_OUTPUT = '04'
-OPCODE_JUMP_IF_TRUE = '05'
-OPCODE_JUMP_IF_FALSE = '06'
-OPCODE_LESS_THAN = '07'
-OPCODE_EQUALS = '08'
-OPCODE_HALT = '99'
-
-MODE_IMMEDIATE = '1'
-MODE_POSITION = '0'
-
-
-def read_file(filename) -> str:
-    """
-    Reads a text file called “orbit-data.txt”
-    and returns a list of strings representing direct orbit relationships.
-    """
-    import os
-    dir_path = os.path.dirname(os.path.realpath(__file__)) + '/' + filename
-    file_content = ''
-
-    with open(dir_path, 'r') as file:
-        file_content = file.read()
-        file.close()
-
-    return file_content.strip()
-
-
-def read_intcode_program(filename) -> List[int]:
-    return list(map(int, read_file(filename).split(',')))
-
-
-def read(intcode: List[int], index: int, param_mode: str) -> int:
-    """
-    Reads a value from the incode program according to its parameter mode.
-
-    Possible parameter modes are:
-
-    - MODE_POSITION: return the value of the intcode at `index`
-    - MODE_IMMEDIATE: return the value of `index` itself
-
-    >>> read([1002, 4, 3, 4, 33], 3, '0')
-    4
-    >>> read([1002, 4, 3, 4, 33], 4, '0')
-    33
-    >>> read([1002, 4, 3, 4, 33], 3, '1')
-    3
-    >>> read([3, 0, 4, 0, 99], 0, '0')
-    3
-    """
-    if param_mode == MODE_IMMEDIATE:
-        return index
-    else:
-        # Default to position mode (MODE_POSITION)
-        return intcode[index]
+from intcode import Machine, amplifiers, read_intcode_program
 
 
 def process_intcode(intcode: List[int], input_values: List[int] = None):
@@ -100,93 +47,9 @@ def process_intcode(intcode: List[int], input_values: List[int] = None):
     >>> process_intcode([3, 21, 1008, 21, 8, 20, 1005, 20, 22, 107, 8, 21, 20, 1006, 20, 31, 1106, 0, 36, 98, 0, 0, 1002, 21, 125, 20, 4, 20, 1105, 1, 46, 104, 999, 1105, 1, 46, 1101, 1000, 1, 20, 4, 20, 1105, 1, 46, 98, 99], [9])
     1001
     """
+    outputs = Machine(intcode, input_values).run()
 
-    output = None
-    input_counter = 0
-    pointer = 0
-    while (pointer < len(intcode)):
-        param_0 = format(intcode[pointer], '05d')
-        opcode = param_0[-2:]
-
-        if opcode == OPCODE_HALT:
-            break
-
-        if opcode == OPCODE_ADD:
-            param_1_mode = param_0[-3:-2]
-            input_1 = read(intcode, intcode[pointer + 1], param_1_mode)
-
-            param_2_mode = param_0[-4:-3]
-            input_2 = read(intcode, intcode[pointer + 2], param_2_mode)
-
-            intcode[intcode[pointer + 3]] = input_1 + input_2
-
-            pointer += 4
-        elif opcode == OPCODE_MULTIPLY:
-            param_1_mode = param_0[-3:-2]
-            input_1 = read(intcode, intcode[pointer + 1], param_1_mode)
-
-            param_2_mode = param_0[-4:-3]
-            input_2 = read(intcode, intcode[pointer + 2], param_2_mode)
-
-            intcode[intcode[pointer + 3]] = input_1 * input_2
-
-            pointer += 4
-        elif opcode == OPCODE_INPUT:
-            intcode[intcode[pointer + 1]] = input_values[input_counter]
-
-            pointer += 2
-            input_counter += 1
-        elif opcode == OPCODE_OUTPUT:
-            param_1_mode = param_0[-3:-2]
-            input_1 = read(intcode, intcode[pointer + 1], param_1_mode)
-            # print(input_1)
-            output = input_1
-
-            pointer += 2
-        elif opcode == OPCODE_JUMP_IF_TRUE:
-            param_1_mode = param_0[-3:-2]
-            input_1 = read(intcode, intcode[pointer + 1], param_1_mode)
-
-            if input_1 != 0:
-                param_2_mode = param_0[-4:-3]
-                input_2 = read(intcode, intcode[pointer + 2], param_2_mode)
-
-                pointer = input_2
-            else:
-                pointer += 3
-        elif opcode == OPCODE_JUMP_IF_FALSE:
-            param_1_mode = param_0[-3:-2]
-            input_1 = read(intcode, intcode[pointer + 1], param_1_mode)
-
-            if input_1 == 0:
-                param_2_mode = param_0[-4:-3]
-                input_2 = read(intcode, intcode[pointer + 2], param_2_mode)
-
-                pointer = input_2
-            else:
-                pointer += 3
-        elif opcode == OPCODE_LESS_THAN:
-            param_1_mode = param_0[-3:-2]
-            input_1 = read(intcode, intcode[pointer + 1], param_1_mode)
-            param_2_mode = param_0[-4:-3]
-            input_2 = read(intcode, intcode[pointer + 2], param_2_mode)
-
-            intcode[intcode[pointer + 3]] = 1 if input_1 < input_2 else 0
-
-            pointer += 4
-        elif opcode == OPCODE_EQUALS:
-            param_1_mode = param_0[-3:-2]
-            input_1 = read(intcode, intcode[pointer + 1], param_1_mode)
-            param_2_mode = param_0[-4:-3]
-            input_2 = read(intcode, intcode[pointer + 2], param_2_mode)
-
-            intcode[intcode[pointer + 3]] = 1 if input_1 == input_2 else 0
-
-            pointer += 4
-        else:
-            raise Exception('A very bad thing happened.')
-
-    return output
+    return outputs[-1] if outputs else None
 
 
 def get_thruster_signal(intcode: List[int], phase_inputs: Tuple[int]) -> int:
@@ -204,20 +67,14 @@ def get_thruster_signal(intcode: List[int], phase_inputs: Tuple[int]) -> int:
     return output
 
 
-def find_max_thruster_signal(intcode: List[int]) -> int:
-    max_thruster_signal = 0
-
-    for phase_inputs in list(itertools.permutations(range(5), 5)):
-        thruster_signal = get_thruster_signal(intcode, phase_inputs)
-
-        if thruster_signal > max_thruster_signal:
-            max_thruster_signal = thruster_signal
+def find_max_thruster_signal(intcode: List[int], workers: int = None) -> int:
+    max_thruster_signal, phase_inputs = amplifiers.find_max_thruster_signal(intcode, range(5), workers=workers)
 
     return max_thruster_signal
 
 
 def main():
-    intcode = read_intcode_program('intcode-program.txt')
+    intcode = read_intcode_program(DIR_PATH + '/intcode-program.txt')
     max_thruster_signal = find_max_thruster_signal(intcode)
     print(max_thruster_signal)
 
@@ -0,0 +1,14 @@
+"""
+A shared Intcode computer for the Advent of Code 2019 puzzles.
+"""
+from .analyzer import analyze, choose_engine, disassemble
+from .binary import map_binary_program, read_binary_program, write_binary_program
+from .blocks import execute_blocks
+from .checkpoint import Checkpointer, restore
+from .compiler import execute_compiled
+from .engines import STATUS_BLOCKED, STATUS_EXHAUSTED, STATUS_HALTED, STATUS_OUTPUT, execute, execute_table
+from .instructions import decode
+from .loader import parse_intcode, read_intcode_memory, read_intcode_program
+from .machine import Machine
+from .memory import MEMORY_ARRAY, MEMORY_LIST, MEMORY_PAGED, PagedMemory
+from .scheduler import Scheduler
@@ -0,0 +1,99 @@
+"""
+Command line tools of the Intcode computer.
+
+    python3 -m intcode convert PROGRAM.txt PROGRAM.intc
+
+converts a program from the comma-separated text format into the binary
+format of `intcode.binary`.
+
+    python3 -m intcode disassemble PROGRAM [--summary]
+
+prints a listing of a program's reachable instructions grouped into basic
+blocks, or with --summary what the analyzer found out about it (see
+`intcode.analyzer`).
+
+    python3 -m intcode trace PROGRAM [INPUT ...] [--last N] [--memory-at STEP]
+
+runs a program with the given input values, also if it fails, and prints
+the last instructions it executed and optionally its memory as it was
+before the instruction with the step number STEP (see `intcode.tracer`).
+"""
+import argparse
+import sys
+
+from .analyzer import analyze, disassemble
+from .binary import write_binary_program
+from .loader import read_intcode_program
+from .machine import Machine
+from .tracer import Tracer
+
+
+def print_disassembly(arguments):
+    intcode = read_intcode_program(arguments.program)
+    analysis = analyze(intcode)
+
+    print(analysis.report() if arguments.summary else disassemble(intcode, analysis))
+
+
+def trace(arguments):
+    tracer = Tracer(arguments.capacity)
+    machine = Machine(read_intcode_program(arguments.program), arguments.inputs, engine=tracer.execute)
+    error = None
+
+    try:
+        status = machine.resume()
+    except Exception as exception:
+        status = 'failed: {}'.format(exception)
+        error = exception
+
+    print(tracer.format(arguments.last))
+    print('{} after {} steps, output: {}'.format(status, machine.steps, list(machine.outputs)))
+
+    if arguments.memory_at is not None:
+        if not tracer.entries:
+            print('step {} not recorded, no steps are'.format(arguments.memory_at), file=sys.stderr)
+            sys.exit(1)
+
+        first, last = tracer.entries[0][0], tracer.entries[-1][0] + 1
+
+        if not first <= arguments.memory_at <= last:
+            print('step {} not recorded, steps {} to {} are'.format(arguments.memory_at, first, last), file=sys.stderr)
+            sys.exit(1)
+
+        print(','.join(map(str, tracer.memory_at(machine, arguments.memory_at))))
+
+    if error is not None:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python3 -m intcode', description='Intcode computer tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert = commands.add_parser('convert', help='convert a program into the binary format')
+    convert.add_argument('source', help='program in text or binary format')
+    convert.add_argument('destination', help='path of the binary program to write')
+
+    disassembling = commands.add_parser('disassemble', help='print the instructions and basic blocks of a program')
+    disassembling.add_argument('program', help='program in text or binary format')
+    disassembling.add_argument('--summary', action='store_true', help='print what the analysis found out instead')
+
+    tracing = commands.add_parser('trace', help='run a program and print the last instructions it executed')
+    tracing.add_argument('program', help='program in text or binary format')
+    tracing.add_argument('inputs', nargs='*', type=int, help='input values')
+    tracing.add_argument('--last', type=int, default=20, help='number of instructions to print')
+    tracing.add_argument('--capacity', type=int, default=1000000, help='number of instructions to record')
+    tracing.add_argument('--memory-at', type=int, metavar='STEP', help='print memory as it was before STEP')
+
+    arguments = parser.parse_args()
+
+    if arguments.command == 'convert':
+        write_binary_program(arguments.destination, read_intcode_program(arguments.source))
+    elif arguments.command == 'disassemble':
+        print_disassembly(arguments)
+    elif arguments.command == 'trace':
+        trace(arguments)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Chains of amplifiers, each running a copy of the same Intcode program
+with its own phase setting (see day 7).
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+import itertools
+import multiprocessing
+import weakref
+
+from .engines import STATUS_HALTED, execute
+from .machine import Machine
+from .scheduler import Scheduler
+
+
+def start_amplifier(intcode: List[int], engine=execute) -> Machine:
+    """
+    Runs the amplifier program up to the point where it reads its phase
+    setting. Amplifiers are forked from the returned machine, so the
+    instructions before that point run only once.
+    """
+    template = Machine(intcode, engine=engine)
+    template.resume()
+
+    return template
+
+
+def get_thruster_signal(intcode: List[int], phase_settings: Sequence[int], feedback: bool = False, engine=execute) -> int:
+    """
+    Runs one amplifier per phase setting. The first amplifier receives the
+    signal 0, every other one receives the output of its predecessor. With
+    `feedback`, the last amplifier's output is fed back into the first one
+    until all amplifiers halt.
+
+    >>> get_thruster_signal([3, 15, 3, 16, 1002, 16, 10, 16, 1, 16, 15, 15, 4, 15, 99, 0, 0], (4, 3, 2, 1, 0))
+    43210
+    >>> get_thruster_signal([3, 26, 1001, 26, -4, 26, 3, 27, 1002, 27, 2, 27, 1, 27, 26, 27, 4, 27, 1001, 28, -1, 28, 1005, 28, 6, 99, 0, 0, 5], (9, 8, 7, 6, 5), feedback=True)
+    139629729
+    >>> get_thruster_signal([3, 7, 3, 7, 99], (0,))
+    Traceback (most recent call last):
+    ...
+    Exception: MISSING OUTPUT
+    """
+    template = start_amplifier(intcode, engine)
+    scheduler = Scheduler()
+    # The scheduler holds the handler, which mustn't keep it alive in turn
+    send = weakref.WeakMethod(scheduler.send)
+    amplifiers = []
+    signals = []
+
+    def deliver(signal: int):
+        signals.append(signal)
+
+        if feedback:
+            send()(amplifiers[0], signal)
+
+    for index, phase_setting in enumerate(phase_settings):
+        amplifier = template.fork()
+        amplifier.send(phase_setting)
+        amplifiers.append(amplifier)
+        scheduler.add(amplifier, deliver if index == len(phase_settings) - 1 else None)
+
+    for amplifier, successor in zip(amplifiers, amplifiers[1:]):
+        scheduler.connect(amplifier, successor)
+
+    scheduler.send(amplifiers[0], 0)
+
+    if scheduler.run() != STATUS_HALTED:
+        # Every amplifier that hasn't halted waits for a signal nobody sends
+        raise Exception('DEADLOCK')
+
+    if not signals:
+        raise Exception('MISSING OUTPUT')
+
+    return signals[-1]
+
+
+def check_phase_range(phase_range: List[int], amplifier_count: int):
+    """
+    Makes sure that there are amplifiers and that each of them can get a
+    phase setting of its own.
+
+    >>> check_phase_range([0, 1, 2], 0)
+    Traceback (most recent call last):
+    ...
+    Exception: ('INVALID AMPLIFIER COUNT', 0)
+    """
+    if amplifier_count < 1:
+        raise Exception('INVALID AMPLIFIER COUNT', amplifier_count)
+
+    if amplifier_count > len(set(phase_range)):
+        raise Exception('NOT ENOUGH PHASE SETTINGS', amplifier_count, len(set(phase_range)))
+
+
+def find_max_serial_thruster_signal(
+    intcode: List[int],
+    phase_range: Iterable[int],
+    amplifier_count: int,
+    engine=execute,
+) -> Tuple[int, Tuple[int, ...]]:
+    """
+    Finds the highest thruster signal of a chain without feedback loop by
+    walking the tree of phase setting prefixes. Permutations sharing a
+    prefix share the amplifier runs for it, and the outputs of an amplifier
+    are memoized by its phase setting and input signals.
+
+    >>> program = [3, 15, 3, 16, 1002, 16, 10, 16, 1, 16, 15, 15, 4, 15, 99, 0, 0]
+    >>> runs = []
+    >>> def counting_engine(machine, *args):
+    ...     runs.append(machine)
+    ...     return execute(machine, *args)
+    >>> find_max_serial_thruster_signal(program, range(5), 5, counting_engine)
+    (43210, (4, 3, 2, 1, 0))
+    >>> len(runs) < 5 * 120
+    True
+    >>> find_max_serial_thruster_signal(program, range(3), 5)
+    Traceback (most recent call last):
+    ...
+    Exception: ('NOT ENOUGH PHASE SETTINGS', 5, 3)
+    >>> find_max_serial_thruster_signal([3, 7, 3, 7, 99], range(2), 1)
+    Traceback (most recent call last):
+    ...
+    Exception: MISSING OUTPUT
+    """
+    phase_range = list(phase_range)
+    check_phase_range(phase_range, amplifier_count)
+    template = start_amplifier(intcode, engine)
+    outputs_by_input = {}
+
+    def amplify(phase_setting, signals):
+        key = (phase_setting, signals)
+
+        if key not in outputs_by_input:
+            machine = template.fork()
+            machine.inputs.extend((phase_setting,) + signals)
+            outputs_by_input[key] = tuple(machine.run())
+
+        return outputs_by_input[key]
+
+    def walk(signals, remaining, depth):
+        if depth == amplifier_count:
+            if not signals:
+                raise Exception('MISSING OUTPUT')
+
+            return signals[-1], ()
+
+        best = None
+
+        for phase_setting in remaining:
+            thruster_signal, phase_settings = walk(
+                amplify(phase_setting, signals),
+                [other for other in remaining if other != phase_setting],
+                depth + 1,
+            )
+            candidate = (thruster_signal, (phase_setting,) + phase_settings)
+
+            if best is None or candidate > best:
+                best = candidate
+
+        return best
+
+    return walk((0,), phase_range, 0)
+
+
+# State shared by all searches running in a worker process. It is set once
+# per worker so that the program isn't sent along with every permutation.
+worker_state = {}
+
+
+def init_worker(intcode: List[int], feedback: bool, engine):
+    worker_state['intcode'] = intcode
+    worker_state['feedback'] = feedback
+    worker_state['engine'] = engine
+
+
+def evaluate_in_worker(phase_settings: Tuple[int, ...]) -> Tuple[int, Tuple[int, ...]]:
+    thruster_signal = get_thruster_signal(
+        worker_state['intcode'], phase_settings, worker_state['feedback'], worker_state['engine'])
+
+    return thruster_signal, phase_settings
+
+
+def find_max_thruster_signal(
+    intcode: List[int],
+    phase_range: Iterable[int],
+    amplifier_count: Optional[int] = None,
+    feedback: bool = False,
+    workers: Optional[int] = None,
+    engine=execute,
+) -> Tuple[int, Tuple[int, ...]]:
+    """
+    Tries all permutations of `amplifier_count` distinct phase settings from
+    `phase_range` and returns the highest thruster signal together with the
+    phase settings producing it.
+
+    Without feedback loop, a serial search shares the amplifier runs of
+    common phase setting prefixes (see `find_max_serial_thruster_signal`).
+    With `workers`, the permutations are distributed across that many
+    processes instead. Each worker receives the program once when it starts.
+
+    >>> program = [3, 15, 3, 16, 1002, 16, 10, 16, 1, 16, 15, 15, 4, 15, 99, 0, 0]
+    >>> find_max_thruster_signal(program, range(5))
+    (43210, (4, 3, 2, 1, 0))
+    >>> find_max_thruster_signal(program, range(5), workers=2)
+    (43210, (4, 3, 2, 1, 0))
+    >>> find_max_thruster_signal(program, range(5), 0)
+    Traceback (most recent call last):
+    ...
+    Exception: ('INVALID AMPLIFIER COUNT', 0)
+    """
+    phase_range = list(phase_range)
+
+    if amplifier_count is None:
+        amplifier_count = len(phase_range)
+
+    check_phase_range(phase_range, amplifier_count)
+    permutations = itertools.permutations(phase_range, amplifier_count)
+
+    if (workers is None or workers <= 1) and not feedback:
+        return find_max_serial_thruster_signal(intcode, phase_range, amplifier_count, engine)
+
+    if workers is None or workers <= 1:
+        return max(
+            (get_thruster_signal(intcode, phase_settings, feedback, engine), phase_settings)
+            for phase_settings in permutations
+        )
+
+    permutations = list(permutations)
+    chunksize = max(1, len(permutations) // (workers * 4))
+
+    with multiprocessing.Pool(workers, init_worker, (intcode, feedback, engine)) as pool:
+        return max(pool.imap_unordered(evaluate_in_worker, permutations, chunksize))
@@ -0,0 +1,594 @@
+"""
+Static analysis of Intcode programs.
+
+The analyzer decodes the instructions reachable from address 0 by following
+jumps instead of reading the program front to back, so that values stored
+between instructions aren't mistaken for code. From them it builds the
+control flow graph of basic blocks and finds out
+
+- which addresses hold code and which constant addresses are used as data,
+- which instructions write into code (the program modifies itself),
+- which instructions write relative to the relative base, which can't be
+  checked statically,
+- where the program reads input and writes output, and whether it does so
+  a fixed number of times or in a loop.
+
+Jumps to computed targets are resolved where the target can only be one of
+the constants the program stores: a position parameter pointing at an
+address the program writes constants to (or doesn't write to at all), and a
+relative parameter, which is taken to be a return address pushed before a
+function call, one of the constants the program writes relative to the
+relative base. Other computed jumps are left unresolved, and the analysis
+is incomplete.
+
+`choose_engine` picks the engine best suited for a program:
+
+    analysis = analyze(intcode)
+    Machine(intcode, [2], engine=choose_engine(analysis)).run()
+
+A listing of a program is printed with
+
+    python3 -m intcode disassemble PROGRAM
+"""
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .blocks import execute_blocks
+from .compiler import OPERATIONS, execute_compiled
+from .engines import execute
+from .instructions import (
+    OPCODE_HALT,
+    OPCODE_INPUT,
+    OPCODE_JUMP_IF_FALSE,
+    OPCODE_JUMP_IF_TRUE,
+    OPCODE_NAMES,
+    OPCODE_OUTPUT,
+    MODE_IMMEDIATE,
+    MODE_POSITION,
+    MODE_RELATIVE,
+    PARAM_COUNTS,
+    WRITING_OPCODES,
+    decode,
+)
+
+
+IO_NONE = 'none'
+IO_FIXED = 'fixed'
+IO_STREAMING = 'streaming'
+IO_UNKNOWN = 'unknown'
+
+JUMP_OPCODES = (OPCODE_JUMP_IF_TRUE, OPCODE_JUMP_IF_FALSE)
+
+
+class BasicBlock:
+    """
+    A sequence of instructions only entered at its first and left after its
+    last one. `instructions` are their addresses, `end` the address
+    following the last one. `successors` are the start addresses of the
+    blocks executed next, `computed` tells whether the block ends with a
+    jump to a computed target.
+    """
+
+    __slots__ = ('start', 'end', 'instructions', 'successors', 'computed')
+
+    def __init__(self, start: int, end: int, instructions: List[int], successors: List[int], computed: bool):
+        self.start = start
+        self.end = end
+        self.instructions = instructions
+        self.successors = successors
+        self.computed = computed
+
+
+class Analysis:
+    """
+    The facts the analyzer found out about a program.
+
+    `instructions` maps the address of each reachable instruction to its
+    opcode, parameter modes and parameters, `blocks` the start address of
+    each basic block to the block. `code` holds all addresses covered by
+    instructions, `data` the constant addresses read or written by them
+    that aren't code. `code_writes` are the addresses of instructions
+    writing into code or over reachable invalid instructions,
+    `relative_writes` the ones writing relative to the relative base,
+    `inputs` and `outputs` the ones reading input and writing output.
+    `jumps` maps the address of each jump to a computed target to the
+    targets it was resolved to, `unresolved` lists the ones that couldn't
+    be, and `invalid` the reachable addresses not holding a valid
+    instruction. `cyclic` holds the start addresses of the blocks lying
+    on a loop.
+    """
+
+    __slots__ = (
+        'instructions', 'blocks', 'code', 'data', 'code_writes', 'relative_writes',
+        'inputs', 'outputs', 'jumps', 'unresolved', 'invalid', 'cyclic',
+    )
+
+    def __init__(self):
+        self.instructions = {}
+        self.blocks = {}
+        self.code = set()
+        self.data = set()
+        self.code_writes = []
+        self.relative_writes = []
+        self.inputs = []
+        self.outputs = []
+        self.jumps = {}
+        self.unresolved = []
+        self.invalid = []
+        self.cyclic = set()
+
+    @property
+    def complete(self) -> bool:
+        """
+        Whether the targets of all jumps are known and all reachable
+        instructions are valid, so that no code is missing from the
+        analysis. Programs reaching invalid instructions usually write
+        the actual ones there before.
+        """
+        return not self.unresolved and not self.invalid
+
+    @property
+    def self_modifying(self) -> bool:
+        return bool(self.code_writes)
+
+    @property
+    def io_pattern(self) -> str:
+        """
+        IO_NONE if the program neither reads input nor writes output,
+        IO_FIXED if each of its input and output instructions runs at most
+        once, IO_STREAMING if some run in a loop, and IO_UNKNOWN if the
+        analysis is incomplete.
+        """
+        if not self.complete:
+            return IO_UNKNOWN
+
+        addresses = self.inputs + self.outputs
+
+        if not addresses:
+            return IO_NONE
+
+        for block in self.blocks.values():
+            if block.start in self.cyclic and any(address in addresses for address in block.instructions):
+                return IO_STREAMING
+
+        return IO_FIXED
+
+    def report(self) -> str:
+        """
+        Summarizes the analysis as human-readable text.
+        """
+        lines = [
+            'instructions: {} in {} blocks, {} in loops'.format(
+                len(self.instructions), len(self.blocks), len(self.cyclic)),
+            'code: {} addresses, data: {} addresses'.format(len(self.code), len(self.data)),
+            'writes into code: {}'.format(format_addresses(self.code_writes)),
+            'relative writes: {}'.format(len(self.relative_writes)),
+            'computed jumps: {}, unresolved: {}'.format(len(self.jumps), format_addresses(self.unresolved)),
+            'invalid instructions: {}'.format(format_addresses(self.invalid)),
+            'input: {}'.format(format_addresses(self.inputs)),
+            'output: {}'.format(format_addresses(self.outputs)),
+            'i/o pattern: {}'.format(self.io_pattern),
+            'engine: {}'.format(choose_engine(self).__name__),
+        ]
+
+        return '\n'.join(lines)
+
+
+def format_addresses(addresses: List[int]) -> str:
+    return ', '.join(map(str, addresses)) or 'none'
+
+
+def decode_instruction(word: Callable[[int], int], pointer: int) -> Optional[Tuple[int, Tuple[int, ...], Tuple[int, ...]]]:
+    """
+    Returns the opcode, parameter modes and parameters of the instruction
+    at `pointer`, or None if it isn't valid.
+
+    >>> decode_instruction([1002, 4, 3, 4].__getitem__, 0)
+    (2, (0, 1, 0), (4, 3, 4))
+    >>> decode_instruction([1103, 4].__getitem__, 0) is None
+    True
+    """
+    opcode, modes = decode(word(pointer))
+
+    if opcode not in PARAM_COUNTS:
+        return None
+
+    count = PARAM_COUNTS[opcode]
+    modes = modes[:count]
+
+    if any(mode not in (MODE_POSITION, MODE_IMMEDIATE, MODE_RELATIVE) for mode in modes):
+        return None
+
+    if opcode in WRITING_OPCODES and modes[-1] == MODE_IMMEDIATE:
+        return None
+
+    return opcode, modes, tuple(word(pointer + 1 + index) for index in range(count))
+
+
+def constant_value(opcode: int, modes: Tuple[int, ...], parameters: Tuple[int, ...]) -> Optional[int]:
+    """
+    Returns the value a writing instruction stores if it only
+    depends on immediate parameters, otherwise None.
+    """
+    if opcode in OPERATIONS and modes[0] == modes[1] == MODE_IMMEDIATE:
+        return OPERATIONS[opcode](parameters[0], parameters[1])
+
+    return None
+
+
+def falls_through(opcode: int, modes: Tuple[int, ...], parameters: Tuple[int, ...]) -> bool:
+    """
+    Whether execution can continue with the instruction following a jump.
+    """
+    if modes[0] != MODE_IMMEDIATE:
+        return True
+
+    return (parameters[0] != 0) != (opcode == OPCODE_JUMP_IF_TRUE)
+
+
+def analyze(intcode: List[int]) -> Analysis:
+    """
+    Analyzes the program starting at address 0.
+
+    A loop counting down a value at address 10 and writing it, followed
+    by a halt and data:
+
+    >>> analysis = analyze([1001, 10, -1, 10, 4, 10, 1005, 10, 0, 99, 3])
+    >>> sorted(analysis.blocks), analysis.blocks[0].successors, analysis.cyclic
+    ([0, 9], [0, 9], {0})
+    >>> sorted(analysis.data), analysis.self_modifying, analysis.io_pattern
+    ([10], False, 'streaming')
+
+    A program echoing its input by writing it into the parameter of its
+    output instruction:
+
+    >>> analysis = analyze([3, 3, 104, 0, 99])
+    >>> analysis.code_writes, analysis.io_pattern
+    ([0], 'fixed')
+
+    A program jumping to the address it reads from input can't be
+    analyzed completely:
+
+    >>> analysis = analyze([3, 6, 105, 1, 6, 99, 0])
+    >>> analysis.jumps, analysis.unresolved, analysis.io_pattern
+    ({2: [0]}, [2], 'unknown')
+
+    A function called twice and returning to the address its caller pushed
+    on the stack, which is resolved to the two return addresses:
+
+    >>> program = [109, 30, 21101, 9, 0, 0, 1105, 1, 20, 21101, 16, 0, 0, 1105, 1, 20, 99]
+    >>> program += [0] * 3 + [104, 7, 2106, 0, 0]
+    >>> analysis = analyze(program)
+    >>> analysis.jumps, analysis.complete, analysis.outputs
+    ({22: [9, 16]}, True, [20])
+    """
+    memory = intcode
+    length = len(memory)
+
+    def word(address):
+        if 0 <= address < length:
+            return memory[address]
+
+        return 0
+
+    analysis = Analysis()
+    instructions = analysis.instructions
+    invalid = set()
+    leaders = {0}
+    pending = [0]
+
+    while pending:
+        while pending:
+            pointer = pending.pop()
+
+            while pointer not in instructions and pointer not in invalid:
+                instruction = decode_instruction(word, pointer) if 0 <= pointer < length else None
+
+                if instruction is None:
+                    invalid.add(pointer)
+                    break
+
+                instructions[pointer] = instruction
+                opcode, modes, parameters = instruction
+                next_pointer = pointer + 1 + len(parameters)
+
+                if opcode == OPCODE_HALT:
+                    break
+
+                if opcode in JUMP_OPCODES:
+                    if modes[1] == MODE_IMMEDIATE:
+                        leaders.add(parameters[1])
+                        pending.append(parameters[1])
+                    else:
+                        analysis.jumps.setdefault(pointer, [])
+
+                    leaders.add(next_pointer)
+
+                    if not falls_through(opcode, modes, parameters):
+                        break
+
+                pointer = next_pointer
+
+        # Resolve computed jumps with the constants written by the code found so far
+        writes = {}
+        constants = set()
+        interior = set()
+
+        for pointer, (opcode, modes, parameters) in instructions.items():
+            interior.update(range(pointer + 1, pointer + 1 + len(parameters)))
+
+            if opcode in WRITING_OPCODES:
+                value = constant_value(opcode, modes, parameters)
+
+                if modes[-1] == MODE_POSITION:
+                    writes.setdefault(parameters[-1], set()).add(value)
+
+                if value is not None:
+                    constants.add(value)
+
+        for pointer, targets in analysis.jumps.items():
+            mode, parameter = instructions[pointer][1][1], instructions[pointer][2][1]
+
+            if pointer + 2 in writes:
+                # The jump's own target parameter is overwritten
+                continue
+
+            if mode == MODE_POSITION:
+                values = (writes.get(parameter, set()) | {word(parameter)}) - {None}
+            else:
+                # Any constant could be the return address, only the ones
+                # that look like the start of code are taken
+                values = {value for value in constants if plausible_target(word, length, value, instructions, interior)}
+
+            for target in sorted(values):
+                if 0 <= target < length and target not in targets:
+                    targets.append(target)
+                    leaders.add(target)
+                    pending.append(target)
+
+    for pointer, (opcode, modes, parameters) in instructions.items():
+        analysis.code.update(range(pointer, pointer + 1 + len(parameters)))
+
+    for pointer in sorted(instructions):
+        opcode, modes, parameters = instructions[pointer]
+
+        for mode, parameter in zip(modes, parameters):
+            if mode == MODE_POSITION and parameter not in analysis.code:
+                analysis.data.add(parameter)
+
+        if opcode in WRITING_OPCODES:
+            if modes[-1] == MODE_RELATIVE:
+                analysis.relative_writes.append(pointer)
+            elif parameters[-1] in analysis.code or parameters[-1] in invalid:
+                analysis.code_writes.append(pointer)
+
+        if opcode == OPCODE_INPUT:
+            analysis.inputs.append(pointer)
+        elif opcode == OPCODE_OUTPUT:
+            analysis.outputs.append(pointer)
+
+    for pointer, targets in sorted(analysis.jumps.items()):
+        mode, parameter = instructions[pointer][1][1], instructions[pointer][2][1]
+
+        if pointer + 2 in writes or mode == MODE_POSITION and None in writes.get(parameter, ()) or not targets:
+            analysis.unresolved.append(pointer)
+
+    analysis.invalid = sorted(invalid)
+    analysis.blocks = build_blocks(instructions, leaders, analysis.jumps)
+    analysis.cyclic = find_cycles(analysis.blocks)
+
+    return analysis
+
+
+def plausible_target(word: Callable[[int], int], length: int, target: int, instructions: Dict[int, tuple], interior: Set[int]) -> bool:
+    """
+    Whether the code starting at `target` decodes into valid instructions
+    up to the next jump or halt without running into the parameters of
+    instructions found before.
+    """
+    pointer = target
+
+    while pointer not in instructions:
+        if not 0 <= pointer < length or pointer in interior:
+            return False
+
+        instruction = decode_instruction(word, pointer)
+
+        if instruction is None:
+            return False
+
+        if instruction[0] == OPCODE_HALT or instruction[0] in JUMP_OPCODES:
+            return True
+
+        pointer += 1 + len(instruction[2])
+
+    return True
+
+
+def build_blocks(instructions: Dict[int, tuple], leaders: Set[int], jumps: Dict[int, List[int]]) -> Dict[int, BasicBlock]:
+    """
+    Splits the instructions into basic blocks starting at the leaders.
+    """
+    blocks = {}
+
+    for start in sorted(leaders):
+        if start not in instructions:
+            continue
+
+        addresses = []
+        successors = []
+        pointer = start
+
+        while pointer in instructions:
+            opcode, modes, parameters = instructions[pointer]
+            addresses.append(pointer)
+            next_pointer = pointer + 1 + len(parameters)
+
+            if opcode == OPCODE_HALT:
+                break
+
+            if opcode in JUMP_OPCODES:
+                targets = [parameters[1]] if modes[1] == MODE_IMMEDIATE else jumps[pointer]
+                successors.extend(targets)
+
+                if falls_through(opcode, modes, parameters) and next_pointer not in successors:
+                    successors.append(next_pointer)
+
+                break
+
+            pointer = next_pointer
+
+            if pointer in leaders:
+                successors.append(pointer)
+                break
+
+        computed = instructions[addresses[-1]][0] in JUMP_OPCODES and addresses[-1] in jumps
+        end = addresses[-1] + 1 + len(instructions[addresses[-1]][2])
+        blocks[start] = BasicBlock(start, end, addresses, successors, computed)
+
+    return blocks
+
+
+def find_cycles(blocks: Dict[int, BasicBlock]) -> Set[int]:
+    """
+    Returns the start addresses of the blocks lying on a loop, which are
+    the ones in strongly connected components of more than one block or
+    with an edge to themselves.
+    """
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    cyclic = set()
+
+    for root in blocks:
+        if root in index:
+            continue
+
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(blocks[root].successors))]
+
+        while work:
+            node, successors = work[-1]
+
+            for successor in successors:
+                if successor not in blocks:
+                    continue
+
+                if successor not in index:
+                    index[successor] = low[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(blocks[successor].successors)))
+                    break
+                elif successor in on_stack:
+                    low[node] = min(low[node], index[successor])
+            else:
+                work.pop()
+
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+                if low[node] == index[node]:
+                    component = []
+
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+
+                        if member == node:
+                            break
+
+                    if len(component) > 1 or node in blocks[node].successors:
+                        cyclic.update(component)
+
+    return cyclic
+
+
+def choose_engine(analysis: Analysis) -> Callable:
+    """
+    Picks the engine for a program: `execute` if none of its code runs
+    more than once, so that nothing is gained by translating it,
+    `execute_blocks` if it writes into its own code, which the blocks
+    engine handles by dropping the blocks written to, and
+    `execute_compiled` otherwise.
+
+    >>> choose_engine(analyze([1, 0, 0, 3, 2, 3, 3, 0, 99])).__name__
+    'execute'
+    >>> choose_engine(analyze([3, 3, 104, 0, 1105, 1, 0])).__name__
+    'execute_blocks'
+    >>> choose_engine(analyze([1001, 10, -1, 10, 4, 10, 1005, 10, 0, 99, 3])).__name__
+    'execute_compiled'
+    """
+    if analysis.complete and not analysis.cyclic:
+        return execute
+
+    if analysis.self_modifying:
+        return execute_blocks
+
+    return execute_compiled
+
+
+def format_parameter(mode: int, parameter: int) -> str:
+    if mode == MODE_IMMEDIATE:
+        return str(parameter)
+    elif mode == MODE_RELATIVE:
+        return '[rb{:+}]'.format(parameter)
+
+    return '[{}]'.format(parameter)
+
+
+def disassemble(intcode: List[int], analysis: Optional[Analysis] = None) -> str:
+    """
+    Returns a listing of the program with its reachable instructions and
+    the values between them. Each block starts with a line naming the
+    blocks executed after it, instructions writing into code and jumps
+    to computed targets are annotated.
+
+    >>> print(disassemble([3, 6, 105, 1, 6, 99, 0]))
+    block 0 -> 0, ?
+         0  input          [6]
+         2  jump-if-true   1 [6]                ; computed jump -> 0
+         5  data           99
+         6  data           0
+    """
+    if analysis is None:
+        analysis = analyze(intcode)
+
+    instructions = analysis.instructions
+    blocks = analysis.blocks
+    code_writes = set(analysis.code_writes)
+    lines = []
+    pointer = 0
+
+    while pointer < len(intcode):
+        if pointer in blocks:
+            block = blocks[pointer]
+            successors = ', '.join(map(str, block.successors))
+
+            if block.instructions[-1] in analysis.unresolved:
+                successors = ', '.join(filter(None, (successors, '?')))
+
+            lines.append('block {}{}'.format(pointer, ' -> ' + successors if successors else ''))
+
+        if pointer not in instructions:
+            lines.append('{:>6}  {:<14} {}'.format(pointer, 'data', intcode[pointer]))
+            pointer += 1
+            continue
+
+        opcode, modes, parameters = instructions[pointer]
+        line = '{:>6}  {:<14} {:<20}'.format(
+            pointer, OPCODE_NAMES[opcode], ' '.join(map(format_parameter, modes, parameters)))
+
+        if pointer in code_writes:
+            line += ' ; writes into code'
+        elif pointer in analysis.jumps:
+            line += ' ; computed jump -> {}'.format(format_addresses(analysis.jumps[pointer]) if analysis.jumps[pointer] else '?')
+
+        lines.append(line.rstrip())
+        pointer += 1 + len(parameters)
+
+    return '\n'.join(lines)
@@ -0,0 +1,165 @@
+"""
+Batch execution of straight-line Intcode programs with NumPy.
+
+Programs made of additions and multiplications only, like the ones of day 2,
+run the same instructions no matter their input. Many memory images of such
+a program, one per row of an array, can therefore be executed in lockstep
+with every instruction applied to all rows at once.
+
+NumPy is imported when a batch is executed, so the rest of the package
+works without it.
+"""
+from typing import Iterable, Optional, Tuple
+
+from .instructions import (
+    OPCODE_ADD,
+    OPCODE_HALT,
+    OPCODE_MULTIPLY,
+    MODE_IMMEDIATE,
+    MODE_POSITION,
+    decode,
+)
+
+
+# Sums and products at or above this magnitude might not fit into 64-bit integers
+OVERFLOW_LIMIT = 2 ** 62
+
+
+class BatchExecutionError(Exception):
+    """
+    Raised for programs that don't execute the same instructions with the
+    same write addresses in every row, or which use instructions other
+    than add and multiply.
+    """
+
+
+def uniform(column, what: str) -> int:
+    value = column[0]
+
+    if (column != value).any():
+        raise BatchExecutionError('INPUT-DEPENDENT ' + what)
+
+    return int(value)
+
+
+def execute_batch(memories, max_steps: int = 100000):
+    """
+    Executes the program in each row of the 2-dimensional integer array
+    `memories` until it halts and returns the resulting memories.
+
+    >>> import numpy
+    >>> memories = numpy.array([[1, 5, 6, 0, 99, 2, 3], [1, 5, 6, 0, 99, 4, 5]])
+    >>> execute_batch(memories).tolist()
+    [[5, 5, 6, 0, 99, 2, 3], [9, 5, 6, 0, 99, 4, 5]]
+
+    Read addresses may differ between rows, write addresses may not:
+
+    >>> execute_batch(numpy.array([[1, 1, 2, 0, 99], [1, 4, 2, 0, 99]])).tolist()
+    [[3, 1, 2, 0, 99], [101, 4, 2, 0, 99]]
+    >>> execute_batch(numpy.array([[1, 0, 0, 1, 99], [1, 0, 0, 2, 99]]))
+    Traceback (most recent call last):
+    ...
+    intcode.batch.BatchExecutionError: INPUT-DEPENDENT WRITE ADDRESS
+
+    Results that might not fit into 64-bit integers are left to machines,
+    which compute with Python integers:
+
+    >>> execute_batch(numpy.array([[1101, 2 ** 62, 2 ** 62, 0, 99]]))
+    Traceback (most recent call last):
+    ...
+    intcode.batch.BatchExecutionError: OVERFLOW
+    """
+    import numpy
+
+    memories = numpy.array(memories, dtype=numpy.int64)
+    rows = numpy.arange(len(memories))
+    pointer = 0
+
+    def load(offset, mode):
+        parameter = memories[:, pointer + offset]
+
+        if mode == MODE_IMMEDIATE:
+            return parameter
+        elif mode != MODE_POSITION:
+            raise BatchExecutionError('UNSUPPORTED MODE', mode)
+
+        if (parameter < 0).any():
+            raise Exception('INVALID ADDRESS')
+
+        # Memory beyond the program is initialized with 0
+        inside = parameter < memories.shape[1]
+
+        return numpy.where(inside, memories[rows, numpy.where(inside, parameter, 0)], 0)
+
+    for _ in range(max_steps):
+        opcode, modes = decode(uniform(memories[:, pointer], 'INSTRUCTION'))
+
+        if opcode == OPCODE_HALT:
+            return memories
+
+        if opcode not in (OPCODE_ADD, OPCODE_MULTIPLY):
+            raise BatchExecutionError('UNSUPPORTED INSTRUCTION', opcode)
+
+        if modes[2] != MODE_POSITION:
+            raise BatchExecutionError('UNSUPPORTED MODE', modes[2])
+
+        input_1, input_2 = load(1, modes[0]), load(2, modes[1])
+        address = uniform(memories[:, pointer + 3], 'WRITE ADDRESS')
+
+        if address < 0:
+            raise Exception('INVALID ADDRESS')
+
+        if address >= memories.shape[1]:
+            padding = numpy.zeros((len(memories), address - memories.shape[1] + 1), dtype=numpy.int64)
+            memories = numpy.hstack((memories, padding))
+
+        if opcode == OPCODE_ADD:
+            if (numpy.abs(input_1.astype(float) + input_2) >= OVERFLOW_LIMIT).any():
+                raise BatchExecutionError('OVERFLOW')
+
+            memories[:, address] = input_1 + input_2
+        else:
+            if (numpy.abs(input_1.astype(float) * input_2) >= OVERFLOW_LIMIT).any():
+                raise BatchExecutionError('OVERFLOW')
+
+            memories[:, address] = input_1 * input_2
+
+        pointer += 4
+
+    raise BatchExecutionError('STEP LIMIT EXCEEDED')
+
+
+def search_noun_verb(
+    intcode,
+    target_output_value: int,
+    noun_range: Iterable[int] = range(100),
+    verb_range: Iterable[int] = range(100),
+) -> Optional[Tuple[int, int]]:
+    """
+    Finds the noun (address 1) and verb (address 2) for which the program
+    leaves `target_output_value` at address 0 by executing all combinations
+    in a single batch. Pairs are checked in the order a brute-force search
+    would try them.
+
+    >>> search_noun_verb([1, 0, 0, 0, 2, 1, 2, 0, 99], 42)
+    (1, 42)
+    >>> search_noun_verb([1, 0, 0, 0, 2, 1, 2, 0, 99], 10007) is None
+    True
+    """
+    import numpy
+
+    nouns = numpy.array(list(noun_range), dtype=numpy.int64)
+    verbs = numpy.array(list(verb_range), dtype=numpy.int64)
+
+    memories = numpy.tile(numpy.array(intcode, dtype=numpy.int64), (len(nouns) * len(verbs), 1))
+    memories[:, 1] = numpy.repeat(nouns, len(verbs))
+    memories[:, 2] = numpy.tile(verbs, len(nouns))
+
+    matches = numpy.flatnonzero(execute_batch(memories)[:, 0] == target_output_value)
+
+    if len(matches) == 0:
+        return None
+
+    noun_index, verb_index = divmod(int(matches[0]), len(verbs))
+
+    return int(nouns[noun_index]), int(verbs[verb_index])
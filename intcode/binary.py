@@ -0,0 +1,239 @@
+"""
+A compact binary format for Intcode programs.
+
+A binary program starts with a header of the magic bytes `INTC`, the format
+version, the number of words and the number of escaped words, followed by
+every word of the program as a little-endian 64-bit integer. Words that
+don't fit into 64 bits are stored as ESCAPE in place and appended after the
+words as their address, byte length and little-endian two's complement
+bytes.
+
+Mapping a binary program into memory doesn't read or copy it: the pages of
+the resulting paged memory are views of the file, which are copied once
+they are written to. Machines started from the same mapped image share all
+pages they don't write to:
+
+    image = map_binary_program('intcode-program.intc')
+    Machine(image, [2], memory='paged').run()
+
+Programs are converted from the text format with
+
+    python3 -m intcode convert intcode-program.txt intcode-program.intc
+"""
+from array import array
+from typing import Iterable, List, Tuple
+import mmap
+import struct
+import sys
+
+from .memory import PAGE_SIZE, PagedMemory
+
+
+MAGIC = b'INTC'
+VERSION = 1
+
+# Magic, version, reserved, number of words, number of escaped words
+HEADER = struct.Struct('<4sHHQQ')
+
+# Address and byte length of an escaped word
+ESCAPE_HEADER = struct.Struct('<QI')
+
+WORD_SIZE = 8
+
+# Placeholder of words stored in the escape table
+ESCAPE = -2 ** 63
+
+
+def encode_words(values: Iterable[int]) -> Tuple[bytes, int, bytes]:
+    """
+    Encodes values as little-endian 64-bit integers. Returns the words, the
+    number of escaped words and the table of escaped words following them.
+    """
+    words = array('q')
+    escapes = []
+
+    for address, value in enumerate(values):
+        if ESCAPE < value < 2 ** 63:
+            words.append(value)
+        else:
+            words.append(ESCAPE)
+            escapes.append((address, value))
+
+    if sys.byteorder != 'little':
+        words.byteswap()
+
+    table = []
+
+    for address, value in escapes:
+        length = (value.bit_length() + 8) // 8
+        table.append(ESCAPE_HEADER.pack(address, length))
+        table.append(value.to_bytes(length, 'little', signed=True))
+
+    return words.tobytes(), len(escapes), b''.join(table)
+
+
+def decode_words(data, offset: int, count: int, escape_count: int) -> Tuple[List[int], int]:
+    """
+    Decodes `count` words starting at `offset` followed by the table of
+    `escape_count` escaped words. Returns the values and the offset
+    following the table.
+
+    >>> words, escape_count, table = encode_words([-1, 2 ** 64, 3])
+    >>> decode_words(words + table, 0, 3, escape_count)
+    ([-1, 18446744073709551616, 3], 45)
+    """
+    end = offset + count * WORD_SIZE
+
+    if len(data) < end:
+        raise Exception('TRUNCATED BINARY DATA')
+
+    words = array('q')
+    words.frombytes(data[offset:end])
+
+    if sys.byteorder != 'little':
+        words.byteswap()
+
+    values = words.tolist()
+    escapes, end = read_escapes(data, end, escape_count)
+
+    for address, value in escapes:
+        values[address] = value
+
+    return values, end
+
+
+def encode_binary_program(intcode: Iterable[int]) -> bytes:
+    """
+    Encodes a program in the binary format.
+
+    >>> data = encode_binary_program([104, 2 ** 70, 99])
+    >>> len(data), decode_binary_program(data)
+    (69, [104, 1180591620717411303424, 99])
+    """
+    words, escape_count, table = encode_words(intcode)
+
+    return HEADER.pack(MAGIC, VERSION, 0, len(words) // WORD_SIZE, escape_count) + words + table
+
+
+def read_header(data) -> Tuple[int, int]:
+    """
+    Returns the number of words and escaped words of a binary program.
+    """
+    if len(data) < HEADER.size:
+        raise Exception('INVALID BINARY PROGRAM')
+
+    magic, version, _, count, escape_count = HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise Exception('INVALID BINARY PROGRAM')
+
+    if version != VERSION:
+        raise Exception('UNSUPPORTED BINARY PROGRAM VERSION', version)
+
+    if len(data) < HEADER.size + count * WORD_SIZE:
+        raise Exception('TRUNCATED BINARY PROGRAM')
+
+    return count, escape_count
+
+
+def read_escapes(data, offset: int, escape_count: int) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Returns the indices and values of the escaped words in the table
+    starting at `offset`, and the offset following the table.
+    """
+    escapes = []
+
+    for _ in range(escape_count):
+        index, length = ESCAPE_HEADER.unpack_from(data, offset)
+        offset += ESCAPE_HEADER.size
+        escapes.append((index, int.from_bytes(data[offset:offset + length], 'little', signed=True)))
+        offset += length
+
+    return escapes, offset
+
+
+def decode_binary_program(data) -> List[int]:
+    """
+    Decodes a program in the binary format into a list.
+    """
+    count, escape_count = read_header(data)
+
+    return decode_words(data, HEADER.size, count, escape_count)[0]
+
+
+def is_binary_program(path: str) -> bool:
+    with open(path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def read_binary_program(path: str) -> List[int]:
+    """
+    Reads the binary program stored in the file at `path` into a list.
+    """
+    with open(path, 'rb') as file:
+        return decode_binary_program(file.read())
+
+
+def write_binary_program(path: str, intcode: Iterable[int]):
+    with open(path, 'wb') as file:
+        file.write(encode_binary_program(intcode))
+
+
+def map_binary_program(path: str, page_size: int = PAGE_SIZE) -> PagedMemory:
+    """
+    Maps the binary program stored in the file at `path` into paged memory
+    without copying it. Each page is a read-only view of the file until it
+    is written to.
+
+    The last page if it's incomplete, pages holding escaped words and, on
+    big-endian platforms, all pages are copied right away.
+
+    >>> import os, tempfile
+    >>> from intcode import Machine
+    >>> path = os.path.join(tempfile.mkdtemp(), 'program.intc')
+    >>> write_binary_program(path, [1001, 10, -1, 10, 1005, 10, 0, 4, 10, 99, 3] + [0] * 5)
+    >>> image = map_binary_program(path, page_size=8)
+    >>> [type(page).__name__ for page in image.pages.values()]
+    ['memoryview', 'memoryview']
+    >>> machine = Machine(image, memory='paged')
+    >>> machine.run()
+    [0]
+    >>> [type(page).__name__ for page in machine.memory.pages.values()]
+    ['memoryview', 'array']
+    >>> image[10]
+    3
+    """
+    with open(path, 'rb') as file:
+        if file.seek(0, 2) == 0:
+            raise Exception('INVALID BINARY PROGRAM')
+
+        # The mapping stays open as long as views of it exist
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    count, escape_count = read_header(mapping)
+    words = memoryview(mapping)[HEADER.size:HEADER.size + count * WORD_SIZE].cast('q')
+    memory = PagedMemory(page_size=page_size)
+
+    for page_index, start in enumerate(range(0, count, page_size)):
+        page = words[start:start + page_size]
+
+        if len(page) < page_size or sys.byteorder != 'little':
+            page = array('q', page.tobytes())
+            if sys.byteorder != 'little':
+                page.byteswap()
+            page.extend([0] * (page_size - len(page)))
+        else:
+            memory.shared.add(page_index)
+
+        memory.pages[page_index] = page
+
+    escapes = read_escapes(mapping, HEADER.size + count * WORD_SIZE, escape_count)[0]
+
+    for address, value in escapes:
+        page_index, offset = divmod(address, page_size)
+        page = memory.pages[page_index] = list(memory.pages[page_index])
+        memory.shared.discard(page_index)
+        page[offset] = value
+
+    return memory
+
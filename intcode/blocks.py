@@ -0,0 +1,374 @@
+"""
+Basic-block caching for the Intcode interpreter.
+
+The first time the machine reaches an address, the instructions from there
+up to the next jump are decoded into a basic block, which is cached by its
+start address. Executing a cached block skips decoding and reading the
+parameters of its instructions.
+
+An instruction writing to a memory cell directly followed by a jump is
+fused into a single superinstruction, like the idiom `1001 x, -1, x`
+`1005 x, loop`. If the jump's condition reads the cell just written, the
+value is reused instead of being read again.
+
+Writes landing inside a cached block drop that block, so that
+self-modifying programs are decoded again.
+"""
+from typing import Callable, List, Optional
+
+from .engines import STATUS_BLOCKED, STATUS_EXHAUSTED, STATUS_HALTED, STATUS_OUTPUT, step, written_address
+from .instructions import (
+    OPCODE_ADD,
+    OPCODE_HALT,
+    OPCODE_INPUT,
+    OPCODE_JUMP_IF_FALSE,
+    OPCODE_JUMP_IF_TRUE,
+    OPCODE_LESS_THAN,
+    OPCODE_MULTIPLY,
+    OPCODE_OFFSET,
+    OPCODE_OUTPUT,
+    MODE_IMMEDIATE,
+    MODE_POSITION,
+    MODE_RELATIVE,
+    PARAM_COUNTS,
+    WRITING_OPCODES,
+    decode,
+)
+
+
+# Upper bound of instructions decoded into a single block
+MAX_BLOCK_INSTRUCTIONS = 64
+
+# Placeholder opcode of a superinstruction's write part for plain jumps
+OPCODE_NONE = 0
+
+
+class Block:
+    """
+    A decoded basic block.
+
+    Each instruction is a tuple of its opcode, address and the modes and
+    values of its parameters, followed by the kind, address and parameters
+    of a jump fused with it. Plain jumps have OPCODE_NONE as opcode, other
+    instructions 0 as jump kind. `reuse` tells whether the jump's condition
+    is the value the instruction wrote.
+
+    `end` is the address following the block's last instruction, `low`
+    the lowest relative base its relative parameters can be accessed with
+    and `count` the number of instructions it executes at most.
+    """
+
+    __slots__ = ('start', 'end', 'instructions', 'low', 'count')
+
+    def __init__(self, start: int, end: int, instructions: List[tuple], low: int):
+        self.start = start
+        self.end = end
+        self.instructions = instructions
+        self.low = low
+        self.count = sum(2 if instruction[8] and instruction[0] != OPCODE_NONE else 1 for instruction in instructions)
+
+
+class BlockCache:
+    """
+    The blocks of a machine by start address, and for each address covered
+    by a block the start addresses of the blocks covering it.
+    """
+
+    __slots__ = ('blocks', 'covered')
+
+    def __init__(self):
+        self.blocks = {}
+        self.covered = {}
+
+    def add(self, block: Block):
+        self.blocks[block.start] = block
+
+        for address in range(block.start, block.end):
+            self.covered.setdefault(address, set()).add(block.start)
+
+    def invalidate(self, address: int):
+        """
+        Drops all blocks covering the address.
+        """
+        for start in self.covered.pop(address, ()):
+            block = self.blocks.pop(start, None)
+
+            if block is not None:
+                for other in range(block.start, block.end):
+                    starts = self.covered.get(other)
+
+                    if starts is not None:
+                        starts.discard(start)
+
+                        if not starts:
+                            del self.covered[other]
+
+
+def build_block(memory, start: int) -> Block:
+    """
+    Decodes the instructions starting at `start` up to and including the
+    next jump or halt instruction. Instructions the block can't execute
+    (invalid opcodes and modes, negative constant addresses) end the block
+    before them and are left to the interpreter.
+
+    >>> block = build_block([1001, 9, -1, 9, 1005, 9, 0, 99, 0, 3], 0)
+    >>> block.end, block.instructions
+    (7, [(1, 0, 0, 9, 1, -1, 0, 9, 5, 4, 0, 9, 1, 0, True)])
+    >>> [instruction[0] for instruction in build_block([104, 1, 99], 0).instructions]
+    [4, 99]
+    """
+    instructions = []
+    offsets = [0]
+    pointer = start
+
+    def word(address):
+        if address < 0:
+            return 0
+
+        try:
+            return memory[address]
+        except IndexError:
+            return 0
+
+    def translatable(pointer, opcode, modes):
+        for index in range(PARAM_COUNTS[opcode]):
+            mode, parameter = modes[index], word(pointer + 1 + index)
+
+            if mode == MODE_RELATIVE:
+                offsets.append(parameter)
+            elif mode not in (MODE_POSITION, MODE_IMMEDIATE) or mode == MODE_POSITION and parameter < 0:
+                return False
+
+        return not (opcode in WRITING_OPCODES and modes[PARAM_COUNTS[opcode] - 1] == MODE_IMMEDIATE)
+
+    while len(instructions) < MAX_BLOCK_INSTRUCTIONS:
+        opcode, modes = decode(word(pointer))
+
+        if opcode not in PARAM_COUNTS or not translatable(pointer, opcode, modes):
+            break
+
+        params = [word(pointer + 1 + index) for index in range(3)]
+        next_pointer = pointer + 1 + PARAM_COUNTS[opcode]
+
+        if opcode in (OPCODE_JUMP_IF_TRUE, OPCODE_JUMP_IF_FALSE):
+            jump = (opcode, pointer, modes[0], params[0], modes[1], params[1])
+            previous = instructions[-1] if instructions else None
+
+            if previous is not None and previous[0] in WRITING_OPCODES and previous[8] == 0:
+                # Fuse the jump into the instruction before it
+                written = previous[0] == OPCODE_INPUT and previous[2:4] or previous[6:8]
+                reuse = (modes[0], params[0]) == tuple(written)
+                instructions[-1] = previous[:8] + jump + (reuse,)
+            else:
+                instructions.append((OPCODE_NONE, pointer, 0, 0, 0, 0, 0, 0) + jump + (False,))
+
+            pointer = next_pointer
+            break
+
+        instructions.append((opcode, pointer, modes[0], params[0], modes[1], params[1], modes[2], params[2],
+                             0, 0, 0, 0, 0, 0, False))
+        pointer = next_pointer
+
+        if opcode == OPCODE_HALT:
+            break
+
+    return Block(start, pointer, instructions, -min(offsets))
+
+
+def execute_blocks(
+    machine,
+    pause_on_output: bool = False,
+    on_output: Optional[Callable[[int], None]] = None,
+    max_steps: Optional[int] = None,
+) -> str:
+    """
+    Executes the machine's instructions block by block, decoding each basic
+    block once and caching it by its start address. Instructions blocks
+    can't execute, and memory accesses beyond the end of memory, are left
+    to the interpreter.
+
+    >>> from intcode import Machine
+    >>> Machine([109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99], engine=execute_blocks).run()
+    [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+    >>> Machine([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [8], engine=execute_blocks).run()
+    [1]
+
+    Blocks that get written to are decoded again:
+
+    >>> machine = Machine([104, 5, 1001, 16, -1, 16, 1101, 7, 0, 1, 1005, 16, 0, 99, 0, 0, 2], engine=execute_blocks)
+    >>> machine.run()
+    [5, 7]
+
+    Blocks longer than the remaining `max_steps` are executed by the
+    interpreter, so that the engine stops after exactly that many steps:
+
+    >>> machine = Machine([1101, 3, 0, 12, 1001, 12, -1, 12, 1005, 12, 4, 99, 0], engine=execute_blocks)
+    >>> machine.resume(max_steps=4), machine.memory[12], machine.resume(), machine.steps
+    ('exhausted', 1, 'halted', 8)
+    """
+    cache = machine.compiled
+    if not isinstance(cache, BlockCache):
+        cache = machine.compiled = BlockCache()
+
+    blocks = cache.blocks
+    covered = cache.covered
+    inputs = machine.inputs
+    emit = machine.outputs.append if on_output is None else on_output
+    pointer = machine.pointer
+    rb = machine.relative_base
+    steps = 0
+    # Blocks are only executed as long as they can't exceed `max_steps`
+    limit = float('inf') if max_steps is None else max_steps
+
+    while True:
+        memory = machine.memory
+        # Address of the instruction currently executed
+        current = pointer
+
+        try:
+            while True:
+                block = blocks.get(pointer)
+                if block is None:
+                    block = build_block(memory, pointer)
+
+                    if not block.instructions:
+                        break
+
+                    cache.add(block)
+
+                if rb < block.low or steps + block.count > limit:
+                    break
+
+                pointer = block.end
+
+                for (opcode, current, mode_1, parameter_1, mode_2, parameter_2, mode_3, parameter_3,
+                     jump, jump_address, condition_mode, condition, target_mode, target, reuse) in block.instructions:
+                    steps += 1
+
+                    if opcode != OPCODE_NONE:
+                        if opcode == OPCODE_HALT:
+                            machine.pointer = current
+                            machine.relative_base = rb
+                            machine.halted = True
+                            machine.steps += steps
+                            return STATUS_HALTED
+
+                        if opcode == OPCODE_INPUT:
+                            if not inputs:
+                                machine.pointer = current
+                                machine.relative_base = rb
+                                machine.steps += steps - 1
+                                return STATUS_BLOCKED
+
+                            # Only take the value once it's stored, in case
+                            # the address is beyond the end of memory
+                            mode_3, parameter_3 = mode_1, parameter_1
+                            memory[parameter_3 if mode_3 == MODE_POSITION else rb + parameter_3] = inputs[0]
+                            value = inputs.popleft()
+                        else:
+                            if mode_1 == MODE_POSITION:
+                                value = memory[parameter_1]
+                            elif mode_1 == MODE_IMMEDIATE:
+                                value = parameter_1
+                            else:
+                                value = memory[rb + parameter_1]
+
+                            if opcode == OPCODE_OUTPUT:
+                                emit(value)
+
+                                if pause_on_output:
+                                    machine.pointer = current + 2
+                                    machine.relative_base = rb
+                                    machine.steps += steps
+                                    return STATUS_OUTPUT
+
+                                continue
+                            elif opcode == OPCODE_OFFSET:
+                                rb += value
+
+                                if rb < block.low:
+                                    pointer = current + 2
+                                    break
+
+                                continue
+
+                            if mode_2 == MODE_POSITION:
+                                other = memory[parameter_2]
+                            elif mode_2 == MODE_IMMEDIATE:
+                                other = parameter_2
+                            else:
+                                other = memory[rb + parameter_2]
+
+                            if opcode == OPCODE_ADD:
+                                value += other
+                            elif opcode == OPCODE_MULTIPLY:
+                                value *= other
+                            elif opcode == OPCODE_LESS_THAN:
+                                value = 1 if value < other else 0
+                            else:
+                                value = 1 if value == other else 0
+
+                        address = parameter_3 if mode_3 == MODE_POSITION else rb + parameter_3
+                        memory[address] = value
+
+                        if address in covered:
+                            cache.invalidate(address)
+                            pointer = jump_address if jump else current + 1 + PARAM_COUNTS[opcode]
+                            break
+
+                        if not jump:
+                            continue
+
+                        steps += 1
+                        current = jump_address
+
+                    if not reuse:
+                        if condition_mode == MODE_POSITION:
+                            value = memory[condition]
+                        elif condition_mode == MODE_IMMEDIATE:
+                            value = condition
+                        else:
+                            value = memory[rb + condition]
+
+                    if (value != 0) == (jump == OPCODE_JUMP_IF_TRUE):
+                        if target_mode == MODE_POSITION:
+                            pointer = memory[target]
+                        elif target_mode == MODE_IMMEDIATE:
+                            pointer = target
+                        else:
+                            pointer = memory[rb + target]
+
+                current = pointer
+        except IndexError:
+            # Memory beyond the end of the list, or a negative address
+            pointer = current
+            steps -= 1
+        except OverflowError:
+            # The value doesn't fit into array-backed memory
+            pointer = current
+            steps -= 1
+
+        machine.pointer = pointer
+        machine.relative_base = rb
+
+        if steps == max_steps:
+            machine.steps += steps
+            return STATUS_EXHAUSTED
+
+        # Let the interpreter execute the instruction blocks couldn't
+        machine.decoded.clear()
+        address = written_address(machine)
+        status = step(machine, pause_on_output, on_output)
+
+        if address in covered:
+            cache.invalidate(address)
+
+        if status != STATUS_BLOCKED:
+            steps += 1
+
+        if status is not None:
+            machine.steps += steps
+            return status
+
+        pointer = machine.pointer
+        rb = machine.relative_base
@@ -0,0 +1,246 @@
+"""
+Checkpoints of the complete state of Intcode machines.
+
+A checkpoint holds a machine's pointer, relative base, step counter, halted
+flag, pending input values, output values and memory in the word encoding
+of `intcode.binary`. The first checkpoint a checkpointer takes holds all
+memory pages, each later one only the pages written to since the previous
+checkpoint. Restoring a full checkpoint followed by the incremental ones
+taken after it recreates the machine as it was when the last one was taken:
+
+    checkpointer = Checkpointer(machine)
+    checkpoints = [checkpointer.checkpoint()]
+    machine.resume(max_steps=1000000)
+    checkpoints.append(checkpointer.checkpoint())
+
+    machine = restore(checkpoints)
+
+Pages of paged memory are shared with the last checkpoint and copied when
+written to, so only pages that were actually written to are saved. List and
+array-backed memory is compared with a copy taken at the last checkpoint.
+
+The engine and the code it compiled aren't part of a checkpoint.
+"""
+from array import array
+from typing import Iterable, Optional, Tuple
+import struct
+
+from .binary import WORD_SIZE, decode_words, encode_words
+from .engines import execute
+from .machine import Machine
+from .memory import MEMORY_ARRAY, MEMORY_LIST, MEMORY_PAGED, PAGE_SIZE, PagedMemory
+
+
+MAGIC = b'INTS'
+VERSION = 1
+
+MEMORY_KINDS = (MEMORY_LIST, MEMORY_ARRAY, MEMORY_PAGED)
+
+# Magic, version, whether the checkpoint is incremental, halted flag,
+# memory kind, sequence number, pointer, relative base, steps, memory
+# length (not used by paged memory), page size and number of pages
+HEADER = struct.Struct('<4sHBBB3xQqqQQQQ')
+
+# Number of values and number of escaped values of a section of words
+SECTION_HEADER = struct.Struct('<QQ')
+
+# Index of a page, followed by a section with its values
+PAGE_HEADER = struct.Struct('<Q')
+
+
+def pack_section(values) -> bytes:
+    words, escape_count, table = encode_words(values)
+
+    return SECTION_HEADER.pack(len(words) // WORD_SIZE, escape_count) + words + table
+
+
+def unpack_section(data, offset: int):
+    count, escape_count = SECTION_HEADER.unpack_from(data, offset)
+
+    return decode_words(data, offset + SECTION_HEADER.size, count, escape_count)
+
+
+def memory_kind(memory) -> str:
+    if isinstance(memory, PagedMemory):
+        return MEMORY_PAGED
+    elif isinstance(memory, array):
+        return MEMORY_ARRAY
+
+    return MEMORY_LIST
+
+
+class Checkpointer:
+    """
+    Takes checkpoints of a machine. The first checkpoint is a full one,
+    later ones only hold the memory pages written to since the previous.
+
+    >>> machine = Machine([1001, 2000, 1, 2000, 4, 2000, 3, 3000, 1105, 1, 0], range(100), memory='paged')
+    >>> checkpointer = Checkpointer(machine)
+    >>> full = checkpointer.checkpoint()
+    >>> machine.resume(max_steps=50)
+    'exhausted'
+    >>> incremental = checkpointer.checkpoint()
+
+    The full checkpoint holds the page with the program, the incremental one
+    the two pages holding addresses 2000 and 3000, with 8 bytes per value:
+
+    >>> len(full), len(incremental)
+    (9116, 17340)
+    >>> restored = restore([full, incremental])
+    >>> restored.resume(), machine.resume()
+    ('blocked', 'blocked')
+    >>> list(restored.outputs) == list(machine.outputs), restored.memory[3000], restored.steps == machine.steps
+    (True, 99, True)
+    """
+
+    def __init__(self, machine: Machine, page_size: int = PAGE_SIZE):
+        self.machine = machine
+        self.page_size = page_size
+        self.sequence = 0
+        # Memory as of the last checkpoint
+        self.base = None
+
+    def checkpoint(self) -> bytes:
+        """
+        Returns a checkpoint of the machine's current state.
+        """
+        machine = self.machine
+        memory = machine.memory
+        kind = memory_kind(memory)
+        incremental = self.base is not None
+
+        if kind == MEMORY_PAGED:
+            page_size = memory.page_size
+            indices = set(memory.pages)
+            base_pages = self.base.pages if incremental else {}
+
+            if incremental:
+                indices.update(base_pages)
+
+            pages = [
+                (index, memory.pages.get(index, ()))
+                for index in sorted(indices)
+                if memory.pages.get(index) is not base_pages.get(index)
+            ]
+            length = 0
+            self.base = memory.fork()
+        else:
+            page_size = self.page_size
+            length = len(memory)
+            base = self.base if incremental and not isinstance(self.base, PagedMemory) else []
+            pages = []
+
+            for start in range(0, length, page_size):
+                page = memory[start:start + page_size]
+
+                if not incremental or page != base[start:start + page_size]:
+                    pages.append((start // page_size, page))
+
+            self.base = memory[:]
+
+        parts = [
+            HEADER.pack(
+                MAGIC, VERSION, incremental, machine.halted, MEMORY_KINDS.index(kind), self.sequence,
+                machine.pointer, machine.relative_base, machine.steps, length, page_size, len(pages),
+            ),
+            pack_section(machine.inputs),
+            pack_section(machine.outputs),
+        ]
+
+        for index, page in pages:
+            parts.append(PAGE_HEADER.pack(index))
+            parts.append(pack_section(page))
+
+        self.sequence += 1
+
+        return b''.join(parts)
+
+
+def restore(checkpoints: Iterable[bytes], engine=execute) -> Machine:
+    """
+    Restores a machine from a full checkpoint followed by the incremental
+    checkpoints taken after it.
+
+    >>> machine = Machine([3, 7, 4, 7, 99, 0, 0, 0], [5, 2 ** 70], memory='array')
+    >>> machine.resume()
+    'halted'
+    >>> restored = restore([Checkpointer(machine).checkpoint()])
+    >>> restored.memory, restored.inputs, restored.outputs, restored.halted, restored.steps
+    (array('q', [3, 7, 4, 7, 99, 0, 0, 5]), deque([1180591620717411303424]), deque([5]), True, 3)
+    """
+    machine = None
+    sequence = None
+
+    for data in checkpoints:
+        machine, sequence = apply_checkpoint(data, engine, machine, sequence)
+
+    if machine is None:
+        raise Exception('NO CHECKPOINT')
+
+    return machine
+
+
+def apply_checkpoint(data: bytes, engine, machine: Optional[Machine], previous: Optional[int]) -> Tuple[Machine, int]:
+    """
+    Applies a checkpoint to the machine restored from the checkpoint with
+    the sequence number `previous`. Returns the machine and the sequence
+    number of the checkpoint.
+    """
+    if len(data) < HEADER.size:
+        raise Exception('INVALID CHECKPOINT')
+
+    (magic, version, incremental, halted, kind, sequence, pointer, relative_base, steps,
+     length, page_size, page_count) = HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise Exception('INVALID CHECKPOINT')
+
+    if version != VERSION:
+        raise Exception('UNSUPPORTED CHECKPOINT VERSION', version)
+
+    kind = MEMORY_KINDS[kind]
+
+    if incremental:
+        if machine is None or sequence != previous + 1:
+            raise Exception('CHECKPOINT OUT OF SEQUENCE', sequence)
+
+        if kind == MEMORY_LIST and isinstance(machine.memory, array):
+            # The memory turned into a list since the previous checkpoint
+            machine.memory = machine.memory.tolist()
+    else:
+        machine = Machine((), engine=engine, memory=kind)
+
+        if kind == MEMORY_PAGED:
+            machine.memory.page_size = page_size
+
+    memory = machine.memory
+
+    if kind != MEMORY_PAGED and len(memory) < length:
+        memory.extend([0] * (length - len(memory)))
+
+    offset = HEADER.size
+    inputs, offset = unpack_section(data, offset)
+    outputs, offset = unpack_section(data, offset)
+
+    for _ in range(page_count):
+        index, = PAGE_HEADER.unpack_from(data, offset)
+        values, offset = unpack_section(data, offset + PAGE_HEADER.size)
+
+        if kind == MEMORY_PAGED:
+            memory.load_page(index, values)
+        else:
+            start = index * page_size
+            memory[start:start + len(values)] = array('q', values) if kind == MEMORY_ARRAY else values
+
+    machine.pointer = pointer
+    machine.relative_base = relative_base
+    machine.steps = steps
+    machine.halted = bool(halted)
+    machine.inputs.clear()
+    machine.inputs.extend(inputs)
+    machine.outputs.clear()
+    machine.outputs.extend(outputs)
+    machine.decoded.clear()
+    machine.compiled = None
+
+    return machine, sequence
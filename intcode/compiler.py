@@ -0,0 +1,500 @@
+"""
+Translation of Intcode programs into Python functions.
+
+Each entry point the machine reaches gets translated into the source of a
+Python function that runs the instructions from there on, with memory
+accesses turned into plain list indexing. Jumps to constant targets are
+followed within the function, so that a function only returns to the
+dispatch loop on loops, jumps to computed targets or after too many
+instructions. Functions are compiled when their entry point is first
+reached and kept for the lifetime of the machine.
+
+Compiled code assumes that it isn't modified while it runs. If a program
+writes into its own instructions, the machine falls back to the
+interpreter for good.
+"""
+from array import array
+from typing import Callable, List, Optional, Set, Tuple
+
+from .engines import STATUS_BLOCKED, STATUS_EXHAUSTED, STATUS_HALTED, STATUS_OUTPUT, execute, step, written_address
+from .instructions import (
+    OPCODE_ADD,
+    OPCODE_EQUALS,
+    OPCODE_HALT,
+    OPCODE_INPUT,
+    OPCODE_JUMP_IF_TRUE,
+    OPCODE_LESS_THAN,
+    OPCODE_MULTIPLY,
+    OPCODE_OFFSET,
+    OPCODE_OUTPUT,
+    MODE_IMMEDIATE,
+    MODE_POSITION,
+    MODE_RELATIVE,
+    PARAM_COUNTS,
+    WRITING_OPCODES,
+    decode,
+)
+from .memory import read
+
+
+# Statuses only used between compiled functions and the dispatch loop
+STATUS_FAULT = 'fault'
+STATUS_MODIFIED = 'modified'
+STATUS_COLD = 'cold'
+
+# Number of times an address is reached before the code starting there
+# is compiled instead of interpreted
+COMPILE_THRESHOLD = 2
+
+# Upper bound of instructions translated into a single function
+MAX_FUNCTION_INSTRUCTIONS = 200
+
+OPERATIONS = {
+    OPCODE_ADD: lambda input_1, input_2: input_1 + input_2,
+    OPCODE_MULTIPLY: lambda input_1, input_2: input_1 * input_2,
+    OPCODE_LESS_THAN: lambda input_1, input_2: 1 if input_1 < input_2 else 0,
+    OPCODE_EQUALS: lambda input_1, input_2: 1 if input_1 == input_2 else 0,
+}
+
+
+class Interrupt(Exception):
+    """
+    Raised by compiled functions to return to the dispatch loop with a
+    status, the address to continue at, the relative base and the number
+    of instructions executed.
+    """
+
+
+class Untranslatable(Exception):
+    """
+    Raised for instructions the translator leaves to the interpreter.
+    """
+
+
+class CompiledProgram:
+    """
+    The functions compiled for a machine, by entry point, together with the
+    most instructions each of them executes per call, the addresses of all
+    instructions they cover and the constant addresses they write to. Entry
+    points not compiled yet count how often they were reached.
+    """
+
+    __slots__ = ('functions', 'sizes', 'hits', 'code', 'static_writes', 'self_modifying')
+
+    def __init__(self):
+        self.functions = {}
+        self.sizes = {}
+        self.hits = {}
+        self.code = set()
+        self.static_writes = set()
+        self.self_modifying = False
+
+
+def translate(memory: List[int], entry: int, name: str = 'function', overflow: bool = False) -> Tuple[str, Set[int], Set[int], int, int]:
+    """
+    Returns the source of a Python function executing the program in
+    `memory` from the address `entry`, together with the addresses of the
+    instructions it covers, the constant addresses it writes to, the
+    highest constant address it accesses and the number of instructions
+    it translated, which no call of the function can exceed.
+
+    The function takes the memory, the relative base and a tuple of the
+    input queue, the output callback and whether to pause after outputs.
+    It returns the address to continue at, the relative base and the number
+    of instructions it executed, or raises an Interrupt. Every way out of
+    the function follows a single path through the program, so the number
+    of instructions is known when translating. With `overflow`, writes may
+    fail because memory is backed by an array of 64-bit integers, which the
+    interpreter then turns into a list.
+
+    >>> source, code, static_writes, max_address, size = translate([1101, 2, 3, 7, 1105, 1, 0, 0], 0)
+    >>> print(source)
+    def function(m, rb, ctx):
+        pc = 0, 0
+        try:
+            m[7] = 5
+            return 0, rb, 2
+        except (IndexError, OverflowError):
+            raise Interrupt('fault', pc[0], rb, pc[1])
+    >>> sorted(code), static_writes, max_address, size
+    ([0, 1, 2, 3, 4, 5, 6], {7}, 7, 2)
+    """
+    lines = []
+    guards = []
+    code = set()
+    static_writes = set()
+    max_address = [-1]
+    offsets = set()
+    budget = [MAX_FUNCTION_INSTRUCTIONS]
+
+    def word(address):
+        return memory[address] if 0 <= address < len(memory) else 0
+
+    def operand(address, mode):
+        parameter = word(address)
+
+        if mode == MODE_IMMEDIATE:
+            return repr(parameter)
+        elif mode == MODE_POSITION:
+            if parameter < 0:
+                raise Untranslatable()
+
+            max_address[0] = max(max_address[0], parameter)
+            return 'm[{}]'.format(parameter)
+        elif mode == MODE_RELATIVE:
+            offsets.add(parameter)
+            return relative(parameter)
+        else:
+            raise Untranslatable()
+
+    def target(address, mode):
+        parameter = word(address)
+
+        if mode == MODE_POSITION:
+            if parameter < 0:
+                raise Untranslatable()
+
+            static_writes.add(parameter)
+            max_address[0] = max(max_address[0], parameter)
+            return 'm[{}]'.format(parameter), None
+        elif mode == MODE_RELATIVE:
+            offsets.add(parameter)
+            return 'm[a]', relative_address(parameter)
+        else:
+            raise Untranslatable()
+
+    def relative_address(offset):
+        if offset == 0:
+            return 'rb'
+
+        return 'rb {} {}'.format('-' if offset < 0 else '+', abs(offset))
+
+    def relative(offset):
+        return 'm[{}]'.format(relative_address(offset))
+
+    def combine(opcode, input_1, input_2):
+        if input_1.lstrip('-').isdigit() and input_2.lstrip('-').isdigit():
+            # Both operands are immediate, so is the result
+            return repr(OPERATIONS[opcode](int(input_1), int(input_2)))
+
+        # Leave out additions of 0 and multiplications by 1
+        neutral = '0' if opcode == OPCODE_ADD else '1' if opcode == OPCODE_MULTIPLY else None
+        if input_1 == neutral:
+            return input_2
+        elif input_2 == neutral:
+            return input_1
+
+        return {
+            OPCODE_ADD: '{} + {}',
+            OPCODE_MULTIPLY: '{} * {}',
+            OPCODE_LESS_THAN: '1 if {} < {} else 0',
+            OPCODE_EQUALS: '1 if {} == {} else 0',
+        }[opcode].format(input_1, input_2)
+
+    def emit(indent, line):
+        lines.append('    ' * indent + line)
+
+    def emit_interrupt(indent, status, pointer, steps):
+        emit(indent, "raise Interrupt('{}', {}, rb, {})".format(status, pointer, steps))
+
+    def emit_guard(indent, pointer, steps):
+        # Relative addresses are only accessed while the relative base is
+        # high enough for none of them to be negative, since negative list
+        # indices would silently wrap around.
+        guards.append(len(lines))
+        emit(indent, 'if rb < LOW:')
+        emit_interrupt(indent + 1, STATUS_FAULT, pointer, steps)
+
+    def emit_store(indent, next_pointer, address, mode, value, steps, then=None):
+        destination, dynamic_address = target(address, mode)
+
+        if dynamic_address is None:
+            emit(indent, '{} = {}'.format(destination, value))
+        else:
+            emit(indent, 'a = {}'.format(dynamic_address))
+            emit(indent, 'm[a] = {}'.format(value))
+
+        if then is not None:
+            emit(indent, then)
+
+        if dynamic_address is not None:
+            emit(indent, 'if a in code:')
+            emit_interrupt(indent + 1, STATUS_MODIFIED, next_pointer, steps)
+
+    def emit_block(indent, pointer, path):
+        while True:
+            if pointer in path or budget[0] <= 0:
+                emit(indent, 'return {}, rb, {}'.format(pointer, len(path)))
+                return
+
+            budget[0] -= 1
+            path = path | {pointer}
+            opcode, modes = decode(word(pointer))
+
+            # Instructions executed up to and including this one
+            steps = len(path)
+
+            if opcode not in PARAM_COUNTS:
+                code.add(pointer)
+                emit_interrupt(indent, STATUS_FAULT, pointer, steps - 1)
+                return
+
+            next_pointer = pointer + 1 + PARAM_COUNTS[opcode]
+            position = len(lines)
+            code.update(range(pointer, next_pointer))
+
+            try:
+                # Remember the instruction in case it accesses memory beyond
+                # the end or overflows array-backed memory. Constant
+                # addresses are always within the memory.
+                if MODE_RELATIVE in modes[:PARAM_COUNTS[opcode]] or overflow and opcode in WRITING_OPCODES:
+                    emit(indent, 'pc = {}, {}'.format(pointer, steps - 1))
+
+                if opcode in WRITING_OPCODES and opcode != OPCODE_INPUT:
+                    value = combine(opcode, operand(pointer + 1, modes[0]), operand(pointer + 2, modes[1]))
+                    emit_store(indent, next_pointer, pointer + 3, modes[2], value, steps)
+                elif opcode == OPCODE_INPUT:
+                    emit(indent, 'if not ctx[0]:')
+                    emit_interrupt(indent + 1, STATUS_BLOCKED, pointer, steps - 1)
+                    # Only take the value once it's stored, in case the
+                    # store fails
+                    emit_store(indent, next_pointer, pointer + 1, modes[0], 'ctx[0][0]', steps, 'ctx[0].popleft()')
+                elif opcode == OPCODE_OUTPUT:
+                    emit(indent, 'ctx[1]({})'.format(operand(pointer + 1, modes[0])))
+                    emit(indent, 'if ctx[2]:')
+                    emit_interrupt(indent + 1, STATUS_OUTPUT, next_pointer, steps)
+                elif opcode == OPCODE_OFFSET:
+                    emit(indent, 'rb += {}'.format(operand(pointer + 1, modes[0])))
+                    emit_guard(indent, next_pointer, steps)
+                elif opcode == OPCODE_HALT:
+                    emit_interrupt(indent, STATUS_HALTED, pointer, steps)
+                else:
+                    condition = operand(pointer + 1, modes[0])
+                    jump_if = '!=' if opcode == OPCODE_JUMP_IF_TRUE else '=='
+
+                    if modes[1] == MODE_IMMEDIATE:
+                        jump = lambda indent: emit_block(indent, word(pointer + 2), path)
+                    else:
+                        destination = operand(pointer + 2, modes[1])
+                        jump = lambda indent: emit(indent, 'return {}, rb, {}'.format(destination, steps))
+
+                    if modes[0] == MODE_IMMEDIATE:
+                        if (word(pointer + 1) != 0) == (opcode == OPCODE_JUMP_IF_TRUE):
+                            jump(indent)
+                            return
+                    else:
+                        emit(indent, 'if {} {} 0:'.format(condition, jump_if))
+                        jump(indent + 1)
+            except Untranslatable:
+                # Leave the instruction to the interpreter
+                del lines[position:]
+                emit_interrupt(indent, STATUS_FAULT, pointer, steps - 1)
+                return
+
+            if opcode == OPCODE_HALT:
+                return
+
+            pointer = next_pointer
+
+    emit(0, 'def {}(m, rb, ctx):'.format(name))
+    emit(1, 'pc = {}, 0'.format(entry))
+    emit(1, 'try:')
+    emit_guard(2, entry, 0)
+    emit_block(2, entry, frozenset())
+    emit(1, 'except (IndexError, OverflowError):')
+    emit(2, "raise Interrupt('{}', pc[0], rb, pc[1])".format(STATUS_FAULT))
+
+    if offsets:
+        low = str(-min(offsets))
+        source = '\n'.join(line.replace('LOW', low) for line in lines)
+    else:
+        skipped = {index for guard in guards for index in (guard, guard + 1)}
+        source = '\n'.join(line for index, line in enumerate(lines) if index not in skipped)
+
+    return source, code, static_writes, max_address[0], MAX_FUNCTION_INSTRUCTIONS - budget[0]
+
+
+def compile_function(program: CompiledProgram, memory, entry: int) -> Optional[Callable]:
+    """
+    Compiles the function starting at `entry` and registers it with the
+    program. Returns None if the program writes into its own instructions.
+    """
+    name = 'function_{}'.format(entry)
+    source, code, static_writes, max_address, size = translate(memory, entry, name, isinstance(memory, array))
+
+    covered = program.code | code
+    if (program.static_writes | static_writes) & covered:
+        program.self_modifying = True
+        return None
+
+    if max_address >= len(memory):
+        memory.extend([0] * (max_address - len(memory) + 1))
+
+    namespace = {'Interrupt': Interrupt, 'code': program.code}
+    exec(compile(source, '<intcode {}>'.format(name), 'exec'), namespace)
+
+    program.code.update(code)
+    program.static_writes.update(static_writes)
+    program.functions[entry] = namespace[name]
+    program.sizes[entry] = size
+
+    return namespace[name]
+
+
+def interpret(program: CompiledProgram, machine, pause_on_output: bool, on_output) -> Tuple[Optional[str], bool]:
+    """
+    Executes the instruction at the machine's pointer with the interpreter.
+    Returns the status `step` returned and whether the instruction jumped.
+    Marks the program as self-modifying if it wrote into compiled code.
+    """
+    pointer = machine.pointer
+    opcode, modes = decode(read(machine.memory, pointer, MODE_POSITION))
+    address = written_address(machine)
+
+    # Compiled code doesn't keep the cache of decoded instructions up to date
+    machine.decoded.clear()
+    status = step(machine, pause_on_output, on_output)
+
+    if address in program.code:
+        program.self_modifying = True
+
+    return status, machine.pointer != pointer + 1 + PARAM_COUNTS.get(opcode, 0)
+
+
+def fall_back(machine, pause_on_output: bool, on_output, max_steps: Optional[int], steps: int) -> str:
+    """
+    Lets `execute` run the rest of the program after compiled code
+    executed `steps` instructions.
+    """
+    machine.steps += steps
+    machine.decoded.clear()
+
+    return execute(machine, pause_on_output, on_output, None if max_steps is None else max_steps - steps)
+
+
+def execute_compiled(
+    machine,
+    pause_on_output: bool = False,
+    on_output: Optional[Callable[[int], None]] = None,
+    max_steps: Optional[int] = None,
+) -> str:
+    """
+    Executes the machine's instructions by running the Python functions its
+    program was compiled to. Code is interpreted until the address it starts
+    at was reached `COMPILE_THRESHOLD` times, so that code running only once
+    isn't compiled. Programs which write into their own instructions and
+    machines with paged memory are left to `execute`.
+
+    >>> from intcode import Machine
+    >>> Machine([109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99], engine=execute_compiled).run()
+    [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+    >>> Machine([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [8], engine=execute_compiled).run()
+    [1]
+
+    Array-backed memory turns into a list once a value doesn't fit:
+
+    >>> program = [1101, 3, 0, 22, 1101, 3, 0, 23, 1002, 22, 4294967296, 22, 1001, 23, -1, 23, 1005, 23, 8, 4, 22, 99, 0, 0]
+    >>> machine = Machine(program, engine=execute_compiled, memory='array')
+    >>> machine.run() == [3 * 2 ** 96], type(machine.memory).__name__, list(machine.compiled.functions)
+    (True, 'list', [8])
+
+    Loops are compiled once they run a second time, unless they modify
+    their own code:
+
+    >>> machine = Machine([1001, 10, -1, 10, 1005, 10, 0, 104, 7, 99, 3], engine=execute_compiled)
+    >>> machine.run(), list(machine.compiled.functions), machine.compiled.self_modifying
+    ([7], [0], False)
+    >>> machine = Machine([1001, 14, -1, 14, 1101, 7, 0, 12, 1005, 14, 0, 104, 5, 99, 2], engine=execute_compiled)
+    >>> machine.run(), list(machine.compiled.functions), machine.compiled.self_modifying
+    ([7], [], True)
+
+    Functions are only called while they can't exceed `max_steps`, the
+    remaining instructions are interpreted:
+
+    >>> machine = Machine([1101, 300, 0, 12, 1001, 12, -1, 12, 1005, 12, 4, 99, 0], engine=execute_compiled)
+    >>> machine.resume(max_steps=450), machine.memory[12], machine.resume(), machine.steps
+    ('exhausted', 75, 'halted', 602)
+    """
+    program = machine.compiled
+    if not isinstance(program, CompiledProgram):
+        program = machine.compiled = CompiledProgram()
+
+    if program.self_modifying or not isinstance(machine.memory, (list, array)):
+        return execute(machine, pause_on_output, on_output, max_steps)
+
+    functions = program.functions
+    sizes = program.sizes
+    context = (machine.inputs, machine.outputs.append if on_output is None else on_output, pause_on_output)
+    pointer = machine.pointer
+    rel_base = machine.relative_base
+    steps = 0
+    # Functions are only called as long as they can't exceed `max_steps`.
+    # Below `limit`, no function can, above it their sizes are checked.
+    limit = float('inf') if max_steps is None else max_steps - MAX_FUNCTION_INSTRUCTIONS
+
+    while True:
+        memory = machine.memory
+
+        try:
+            while True:
+                function = functions.get(pointer)
+                if function is None or steps > limit and steps + sizes[pointer] > max_steps:
+                    raise Interrupt(STATUS_COLD, pointer, rel_base, 0)
+
+                pointer, rel_base, count = function(memory, rel_base, context)
+                steps += count
+        except Interrupt as interrupt:
+            status, pointer, rel_base, count = interrupt.args
+            steps += count
+
+        machine.pointer = pointer
+        machine.relative_base = rel_base
+
+        if status == STATUS_HALTED:
+            machine.halted = True
+            machine.steps += steps
+            return STATUS_HALTED
+        elif status in (STATUS_BLOCKED, STATUS_OUTPUT):
+            machine.steps += steps
+            return status
+        elif status == STATUS_MODIFIED:
+            program.self_modifying = True
+            return fall_back(machine, pause_on_output, on_output, max_steps, steps)
+        elif status == STATUS_COLD and pointer not in functions:
+            program.hits[pointer] = program.hits.get(pointer, 0) + 1
+
+            if program.hits[pointer] >= COMPILE_THRESHOLD:
+                if compile_function(program, memory, pointer) is None:
+                    return fall_back(machine, pause_on_output, on_output, max_steps, steps)
+
+                if max_steps is None or steps + program.sizes[pointer] <= max_steps:
+                    continue
+
+        # Interpret cold code up to the next jump, or the single instruction
+        # compiled code couldn't execute
+        while True:
+            if steps == max_steps:
+                machine.steps += steps
+                return STATUS_EXHAUSTED
+
+            status, jumped = interpret(program, machine, pause_on_output, on_output)
+
+            if status != STATUS_BLOCKED:
+                steps += 1
+
+            if program.self_modifying:
+                if status is not None:
+                    machine.steps += steps
+                    return status
+
+                return fall_back(machine, pause_on_output, on_output, max_steps, steps)
+
+            if status is not None:
+                machine.steps += steps
+                return status
+
+            if jumped or machine.pointer in functions:
+                break
+
+        pointer = machine.pointer
+        rel_base = machine.relative_base
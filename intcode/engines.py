@@ -0,0 +1,408 @@
+"""
+Execution engines for Intcode machines.
+
+An engine executes the instructions of a machine, starting at its pointer,
+until the machine halts or needs an input value that isn't available yet.
+It returns a status telling which of the two happened. If `pause_on_output`
+is set, the engine also returns after each value the machine outputs. If
+`max_steps` is given, the engine returns once it executed that many
+instructions. Engines add the number of instructions they executed to the
+machine's step counter.
+
+Output values are appended to the machine's output queue, or passed to
+`on_output` if a callback is given.
+"""
+from typing import Callable, Optional
+
+from .instructions import (
+    OPCODE_ADD,
+    OPCODE_EQUALS,
+    OPCODE_HALT,
+    OPCODE_INPUT,
+    OPCODE_JUMP_IF_FALSE,
+    OPCODE_JUMP_IF_TRUE,
+    OPCODE_LESS_THAN,
+    OPCODE_MULTIPLY,
+    OPCODE_OFFSET,
+    OPCODE_OUTPUT,
+    MODE_IMMEDIATE,
+    MODE_POSITION,
+    MODE_RELATIVE,
+    decode,
+)
+from .memory import read, resolve_address
+
+
+STATUS_HALTED = 'halted'
+STATUS_BLOCKED = 'blocked'
+STATUS_OUTPUT = 'output'
+STATUS_EXHAUSTED = 'exhausted'
+
+
+def execute(
+    machine,
+    pause_on_output: bool = False,
+    on_output: Optional[Callable[[int], None]] = None,
+    max_steps: Optional[int] = None,
+) -> str:
+    """
+    Executes the machine's instructions with an if/elif chain over opcodes.
+
+    Instructions are decoded once per address. Writes drop the cached entry
+    of the address they land on. The machine state is kept in local variables
+    while running and stored back on the machine when the engine returns.
+
+    >>> from intcode import Machine
+    >>> machine = Machine([1101, 1, 2, 9, 4, 9, 1105, 1, 0, 0])
+    >>> execute(machine, max_steps=5), list(machine.outputs), machine.pointer, machine.steps
+    ('exhausted', [3, 3], 6, 5)
+    """
+    memory = machine.memory
+    decoded = machine.decoded
+    inputs = machine.inputs
+    outputs = machine.outputs
+    pointer = machine.pointer
+    rel_base = machine.relative_base
+    steps = 0
+
+    def load(offset, mode):
+        parameter = memory[pointer + offset]
+
+        if mode == MODE_IMMEDIATE:
+            return parameter
+        elif mode == MODE_POSITION:
+            address = parameter
+        elif mode == MODE_RELATIVE:
+            address = rel_base + parameter
+        else:
+            raise Exception('INVALID READ MODE', mode)
+
+        if address < 0:
+            raise Exception('INVALID ADDRESS')
+
+        try:
+            return memory[address]
+        except IndexError:
+            # Memory beyond the program is initialized with 0
+            return 0
+
+    def store(offset, mode, value):
+        nonlocal memory
+        parameter = memory[pointer + offset]
+
+        if mode == MODE_POSITION:
+            address = parameter
+        elif mode == MODE_RELATIVE:
+            address = rel_base + parameter
+        else:
+            raise Exception('INVALID WRITE MODE', mode)
+
+        if address < 0:
+            raise Exception('INVALID ADDRESS')
+
+        try:
+            memory[address] = value
+        except IndexError:
+            memory.extend([0] * (address - len(memory) + 1))
+            memory[address] = value
+        except OverflowError:
+            # The value doesn't fit into array-backed memory
+            memory = machine.memory = list(memory)
+            memory[address] = value
+
+        decoded.pop(address, None)
+
+    try:
+        while True:
+            if steps == max_steps:
+                return STATUS_EXHAUSTED
+
+            steps += 1
+            instruction = decoded.get(pointer)
+            if instruction is None:
+                instruction = decoded[pointer] = decode(read(memory, pointer, MODE_POSITION))
+            opcode, (mode_1, mode_2, mode_3) = instruction
+
+            if opcode == OPCODE_ADD:
+                store(3, mode_3, load(1, mode_1) + load(2, mode_2))
+                pointer += 4
+            elif opcode == OPCODE_MULTIPLY:
+                store(3, mode_3, load(1, mode_1) * load(2, mode_2))
+                pointer += 4
+            elif opcode == OPCODE_OFFSET:
+                rel_base += load(1, mode_1)
+                pointer += 2
+            elif opcode == OPCODE_JUMP_IF_TRUE:
+                if load(1, mode_1) != 0:
+                    pointer = load(2, mode_2)
+                else:
+                    pointer += 3
+            elif opcode == OPCODE_JUMP_IF_FALSE:
+                if load(1, mode_1) == 0:
+                    pointer = load(2, mode_2)
+                else:
+                    pointer += 3
+            elif opcode == OPCODE_LESS_THAN:
+                store(3, mode_3, 1 if load(1, mode_1) < load(2, mode_2) else 0)
+                pointer += 4
+            elif opcode == OPCODE_EQUALS:
+                store(3, mode_3, 1 if load(1, mode_1) == load(2, mode_2) else 0)
+                pointer += 4
+            elif opcode == OPCODE_INPUT:
+                if not inputs:
+                    steps -= 1
+                    return STATUS_BLOCKED
+
+                store(1, mode_1, inputs.popleft())
+                pointer += 2
+            elif opcode == OPCODE_OUTPUT:
+                value = load(1, mode_1)
+                pointer += 2
+
+                if on_output is None:
+                    outputs.append(value)
+                else:
+                    on_output(value)
+
+                if pause_on_output:
+                    return STATUS_OUTPUT
+            elif opcode == OPCODE_HALT:
+                machine.halted = True
+                return STATUS_HALTED
+            else:
+                raise Exception('A very bad thing happened.')
+    finally:
+        machine.pointer = pointer
+        machine.relative_base = rel_base
+        machine.steps += steps
+
+
+def store(machine, address, value):
+    try:
+        machine.memory[address] = value
+    except OverflowError:
+        # The value doesn't fit into array-backed memory
+        machine.memory = list(machine.memory)
+        machine.memory[address] = value
+
+    machine.decoded.pop(address, None)
+
+
+def execute_add(machine, input_1, input_2, address):
+    store(machine, address, input_1 + input_2)
+
+
+def execute_multiply(machine, input_1, input_2, address):
+    store(machine, address, input_1 * input_2)
+
+
+def execute_input(machine, address):
+    store(machine, address, machine.inputs.popleft())
+
+
+def execute_output(machine, value):
+    machine.outputs.append(value)
+
+
+def execute_jump_if_true(machine, value):
+    return value != 0
+
+
+def execute_jump_if_false(machine, value):
+    return value == 0
+
+
+def execute_less_than(machine, input_1, input_2, address):
+    store(machine, address, 1 if input_1 < input_2 else 0)
+
+
+def execute_equals(machine, input_1, input_2, address):
+    store(machine, address, 1 if input_1 == input_2 else 0)
+
+
+def execute_offset(machine, value):
+    machine.relative_base += value
+
+
+def execute_halt(machine):
+    machine.halted = True
+
+
+def run_none(handler, machine, memory, pointer, modes, rel_base):
+    return handler(machine)
+
+
+def run_read(handler, machine, memory, pointer, modes, rel_base):
+    return handler(machine, read(memory, memory[pointer + 1], modes[0], rel_base))
+
+
+def run_write(handler, machine, memory, pointer, modes, rel_base):
+    return handler(machine, resolve_address(memory, memory[pointer + 1], modes[0], rel_base))
+
+
+def run_jump(handler, machine, memory, pointer, modes, rel_base):
+    """
+    Resolves the condition of the jump at `pointer` and, like `execute`,
+    its target only if the handler takes the jump.
+
+    >>> run_jump(execute_jump_if_false, None, [106, 1, -5], 0, (1, 0), 0) is None
+    True
+    >>> run_jump(execute_jump_if_true, None, [1105, 1, 7], 0, (1, 1), 0)
+    7
+    """
+    if handler(machine, read(memory, memory[pointer + 1], modes[0], rel_base)):
+        return read(memory, memory[pointer + 2], modes[1], rel_base)
+
+
+def run_read_read_write(handler, machine, memory, pointer, modes, rel_base):
+    """
+    Resolves the parameters of the instruction at `pointer` and calls
+    its handler with them.
+
+    >>> run_read_read_write(lambda machine, *operands: operands, None, [1002, 4, 3, 4, 33], 0, (0, 1, 0), 0)
+    (33, 3, 4)
+    """
+    return handler(
+        machine,
+        read(memory, memory[pointer + 1], modes[0], rel_base),
+        read(memory, memory[pointer + 2], modes[1], rel_base),
+        resolve_address(memory, memory[pointer + 3], modes[2], rel_base),
+    )
+
+
+PARAM_READ = 'read'
+PARAM_WRITE = 'write'
+
+# Maps each opcode to its handler, the kinds of its parameters and the
+# function resolving them for its handler. Handlers receive their operands
+# already resolved: values for read parameters and memory addresses for
+# write parameters. Jump handlers only receive their condition and return
+# whether to jump, so that the target is resolved only for jumps taken.
+# A runner returning an address jumps there, otherwise the pointer advances
+# past the instruction.
+INSTRUCTIONS = {
+    OPCODE_ADD: (execute_add, (PARAM_READ, PARAM_READ, PARAM_WRITE), run_read_read_write),
+    OPCODE_MULTIPLY: (execute_multiply, (PARAM_READ, PARAM_READ, PARAM_WRITE), run_read_read_write),
+    OPCODE_INPUT: (execute_input, (PARAM_WRITE,), run_write),
+    OPCODE_OUTPUT: (execute_output, (PARAM_READ,), run_read),
+    OPCODE_JUMP_IF_TRUE: (execute_jump_if_true, (PARAM_READ, PARAM_READ), run_jump),
+    OPCODE_JUMP_IF_FALSE: (execute_jump_if_false, (PARAM_READ, PARAM_READ), run_jump),
+    OPCODE_LESS_THAN: (execute_less_than, (PARAM_READ, PARAM_READ, PARAM_WRITE), run_read_read_write),
+    OPCODE_EQUALS: (execute_equals, (PARAM_READ, PARAM_READ, PARAM_WRITE), run_read_read_write),
+    OPCODE_OFFSET: (execute_offset, (PARAM_READ,), run_read),
+    OPCODE_HALT: (execute_halt, (), run_none),
+}
+
+
+def step(machine, pause_on_output: bool = False, on_output: Optional[Callable[[int], None]] = None) -> Optional[str]:
+    """
+    Executes the instruction at the machine's pointer by dispatching it
+    through the `INSTRUCTIONS` table. Returns a status if the machine halted,
+    needs an input value that isn't available, or paused after an output.
+
+    >>> from intcode import Machine
+    >>> machine = Machine([1101, 2, 3, 5, 99, 0])
+    >>> step(machine), machine.memory, machine.pointer
+    (None, [1101, 2, 3, 5, 99, 5], 4)
+    >>> step(machine), machine.halted, machine.pointer
+    ('halted', True, 4)
+
+    Like `execute`, jumps not taken don't resolve their target:
+
+    >>> Machine([106, 1, -5, 104, 7, 99], engine=execute_table).run()
+    [7]
+    """
+    memory = machine.memory
+    pointer = machine.pointer
+
+    instruction = machine.decoded.get(pointer)
+    if instruction is None:
+        instruction = machine.decoded[pointer] = decode(read(memory, pointer, MODE_POSITION))
+    opcode, modes = instruction
+
+    if opcode not in INSTRUCTIONS:
+        raise Exception('A very bad thing happened.')
+
+    if opcode == OPCODE_INPUT and not machine.inputs:
+        return STATUS_BLOCKED
+
+    handler, params, run = INSTRUCTIONS[opcode]
+    target = run(handler, machine, memory, pointer, modes, machine.relative_base)
+
+    if target is not None:
+        machine.pointer = target
+    elif opcode != OPCODE_HALT:
+        # Like `execute`, halted machines keep pointing at the halt
+        machine.pointer = pointer + 1 + len(params)
+
+    if opcode == OPCODE_OUTPUT:
+        if on_output is not None:
+            on_output(machine.outputs.pop())
+
+        if pause_on_output:
+            return STATUS_OUTPUT
+
+    if machine.halted:
+        return STATUS_HALTED
+
+    return None
+
+
+def written_address(machine) -> Optional[int]:
+    """
+    Returns the address the instruction at the machine's pointer writes to,
+    if it writes to one and can be executed.
+
+    >>> from intcode import Machine
+    >>> written_address(Machine([21101, 1, 2, 5, 99], engine=execute_table))
+    5
+    >>> written_address(Machine([3, 5, 99])) is None
+    True
+    """
+    memory = machine.memory
+    pointer = machine.pointer
+    opcode, modes = decode(read(memory, pointer, MODE_POSITION))
+
+    if opcode not in INSTRUCTIONS or opcode == OPCODE_INPUT and not machine.inputs:
+        return None
+
+    params = INSTRUCTIONS[opcode][1]
+
+    if PARAM_WRITE not in params:
+        return None
+
+    index = params.index(PARAM_WRITE)
+
+    return resolve_address(memory, read(memory, pointer + 1 + index, MODE_POSITION), modes[index], machine.relative_base)
+
+
+def execute_table(
+    machine,
+    pause_on_output: bool = False,
+    on_output: Optional[Callable[[int], None]] = None,
+    max_steps: Optional[int] = None,
+) -> str:
+    """
+    Executes the machine's instructions like `execute`,
+    but dispatches them through the `INSTRUCTIONS` table.
+    """
+    steps = 0
+
+    try:
+        while not machine.halted:
+            if steps == max_steps:
+                return STATUS_EXHAUSTED
+
+            status = step(machine, pause_on_output, on_output)
+
+            if status == STATUS_BLOCKED:
+                return status
+
+            steps += 1
+
+            if status is not None:
+                return status
+
+        return STATUS_HALTED
+    finally:
+        machine.steps += steps
@@ -0,0 +1,69 @@
+from functools import lru_cache
+from typing import Tuple
+
+
+OPCODE_ADD = 1
+OPCODE_MULTIPLY = 2
+OPCODE_INPUT = 3
+OPCODE_OUTPUT = 4
+OPCODE_JUMP_IF_TRUE = 5
+OPCODE_JUMP_IF_FALSE = 6
+OPCODE_LESS_THAN = 7
+OPCODE_EQUALS = 8
+OPCODE_OFFSET = 9
+OPCODE_HALT = 99
+
+OPCODE_NAMES = {
+    OPCODE_ADD: 'add',
+    OPCODE_MULTIPLY: 'multiply',
+    OPCODE_INPUT: 'input',
+    OPCODE_OUTPUT: 'output',
+    OPCODE_JUMP_IF_TRUE: 'jump-if-true',
+    OPCODE_JUMP_IF_FALSE: 'jump-if-false',
+    OPCODE_LESS_THAN: 'less-than',
+    OPCODE_EQUALS: 'equals',
+    OPCODE_OFFSET: 'offset',
+    OPCODE_HALT: 'halt',
+}
+
+# Number of parameters of each instruction
+PARAM_COUNTS = {
+    OPCODE_ADD: 3,
+    OPCODE_MULTIPLY: 3,
+    OPCODE_INPUT: 1,
+    OPCODE_OUTPUT: 1,
+    OPCODE_JUMP_IF_TRUE: 2,
+    OPCODE_JUMP_IF_FALSE: 2,
+    OPCODE_LESS_THAN: 3,
+    OPCODE_EQUALS: 3,
+    OPCODE_OFFSET: 1,
+    OPCODE_HALT: 0,
+}
+
+# Instructions writing their last parameter
+WRITING_OPCODES = (OPCODE_ADD, OPCODE_MULTIPLY, OPCODE_INPUT, OPCODE_LESS_THAN, OPCODE_EQUALS)
+
+MODE_POSITION = 0
+MODE_IMMEDIATE = 1
+MODE_RELATIVE = 2
+
+
+@lru_cache(maxsize=None)
+def decode(instruction: int) -> Tuple[int, Tuple[int, int, int]]:
+    """
+    Splits an instruction into its opcode and the modes of its three parameters.
+
+    Results are cached by instruction value, so machines running the same
+    program share the work of decoding it.
+
+    >>> decode(1002)
+    (2, (0, 1, 0))
+    >>> decode(21101)
+    (1, (1, 1, 2))
+    >>> decode(99)
+    (99, (0, 0, 0))
+    """
+    opcode = instruction % 100
+    modes = (instruction // 100 % 10, instruction // 1000 % 10, instruction // 10000 % 10)
+
+    return opcode, modes
@@ -0,0 +1,159 @@
+from array import array
+from typing import IO, Iterator, List
+
+from .binary import is_binary_program, map_binary_program, read_binary_program
+from .memory import MEMORY_ARRAY, MEMORY_LIST, MEMORY_PAGED, PAGE_SIZE, PagedMemory
+
+
+# Number of characters read from a program file at once
+CHUNK_SIZE = 1 << 16
+
+
+def parse_intcode(text: str) -> List[int]:
+    """
+    Parses a comma-separated Intcode program.
+
+    >>> parse_intcode('1,0,0,3,99\\n')
+    [1, 0, 0, 3, 99]
+    """
+    return list(map(int, text.strip().split(',')))
+
+
+def parse_intcode_chunks(file: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[List[int]]:
+    """
+    Parses a comma-separated Intcode program from a file chunk by chunk
+    and yields the values of each chunk. Only a chunk and the value
+    split by its end are held in memory at once.
+
+    >>> import io
+    >>> list(parse_intcode_chunks(io.StringIO('1,0,0,3,99\\n'), chunk_size=3))
+    [[1], [0, 0], [3], [], [99]]
+    """
+    rest = ''
+
+    while True:
+        chunk = file.read(chunk_size)
+
+        if not chunk:
+            break
+
+        tokens = (rest + chunk).split(',')
+        # The last token might continue in the next chunk
+        rest = tokens.pop()
+
+        yield list(map(int, tokens))
+
+    if rest.strip():
+        yield [int(rest)]
+
+
+def read_intcode_program(path: str) -> List[int]:
+    """
+    Reads the Intcode program stored in the file at `path`, either as
+    comma-separated text or in the binary format of `intcode.binary`.
+    """
+    return read_intcode_memory(path, MEMORY_LIST)
+
+
+def read_intcode_memory(path: str, kind: str = MEMORY_ARRAY, chunk_size: int = CHUNK_SIZE):
+    """
+    Reads the Intcode program stored in the file at `path` straight into
+    memory of the given kind, which machines can be created from. Text is
+    parsed chunk by chunk, so that reading a program takes little more
+    memory than the program itself needs. Binary programs are decoded, or
+    mapped into paged memory.
+
+    A machine only runs in this memory without copying it when created
+    with the same memory kind and `copy=False`:
+
+        Machine(read_intcode_memory(path, 'array'), memory='array', copy=False)
+
+    Otherwise the machine copies the program, and with list-backed memory
+    turns every value back into a Python integer.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'program.txt')
+    >>> with open(path, 'w') as file:
+    ...     _ = file.write('104,1125899906842624000000,99\\n')
+    >>> read_intcode_memory(path, MEMORY_ARRAY, chunk_size=4)
+    [104, 1125899906842624000000, 99]
+    >>> memory = read_intcode_memory(path, MEMORY_PAGED, chunk_size=4)
+    >>> memory[1], memory.pages_allocated
+    (1125899906842624000000, 1)
+    """
+    if is_binary_program(path):
+        if kind == MEMORY_PAGED:
+            return map_binary_program(path)
+
+        intcode = read_binary_program(path)
+
+        if kind == MEMORY_ARRAY:
+            try:
+                return array('q', intcode)
+            except OverflowError:
+                pass
+
+        return intcode
+
+    with open(path, 'r') as file:
+        chunks = parse_intcode_chunks(file, chunk_size)
+
+        if kind == MEMORY_LIST:
+            memory = []
+
+            for values in chunks:
+                memory.extend(values)
+
+            return memory
+        elif kind == MEMORY_ARRAY:
+            return fill_array(chunks)
+        elif kind == MEMORY_PAGED:
+            return fill_pages(chunks)
+        else:
+            raise Exception('INVALID MEMORY KIND', kind)
+
+
+def fill_array(chunks: Iterator[List[int]]):
+    """
+    Collects values into an array of 64-bit integers, which turns into a
+    list once a value doesn't fit.
+    """
+    memory = array('q')
+
+    for values in chunks:
+        if isinstance(memory, array):
+            size = len(memory)
+
+            try:
+                memory.extend(values)
+                continue
+            except OverflowError:
+                # The values before the one that doesn't fit were appended
+                del memory[size:]
+                memory = memory.tolist()
+
+        memory.extend(values)
+
+    return memory
+
+
+def fill_pages(chunks: Iterator[List[int]], page_size: int = PAGE_SIZE) -> PagedMemory:
+    """
+    Collects values into paged memory a page at a time.
+    """
+    memory = PagedMemory(page_size=page_size)
+    buffer = []
+    page_index = 0
+
+    for values in chunks:
+        buffer.extend(values)
+
+        while len(buffer) >= page_size:
+            memory.load_page(page_index, buffer[:page_size])
+            del buffer[:page_size]
+            page_index += 1
+
+    if buffer:
+        memory.load_page(page_index, buffer)
+
+    return memory
@@ -0,0 +1,323 @@
+from collections import deque
+import asyncio
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from .engines import STATUS_BLOCKED, STATUS_HALTED, STATUS_OUTPUT, execute
+from .memory import MEMORY_LIST, allocate, fork_memory
+
+
+# Instructions an asynchronous machine executes before it lets other tasks run
+SLICE_BUDGET = 10000
+
+
+class Machine:
+    """
+    An Intcode computer with its own memory, instruction pointer,
+    relative base and queues of input and output values.
+
+    >>> Machine([3, 0, 4, 0, 99], [7]).run()
+    [7]
+    >>> Machine([109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]).run()
+    [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+    >>> Machine([1102, 34915192, 34915192, 7, 4, 7, 99, 0]).run()
+    [1219070632396864]
+    >>> Machine([104, 1125899906842624, 99]).run()
+    [1125899906842624]
+
+    The engine executing the instructions can be swapped:
+
+    >>> from intcode.engines import execute_table
+    >>> Machine([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [8], engine=execute_table).run()
+    [1]
+
+    Memory can be backed by an array of 64-bit integers, which takes less
+    space than a list. It turns into a list once a value doesn't fit anymore:
+
+    >>> machine = Machine([1102, 34915192, 34915192, 7, 4, 7, 99, 0], memory='array')
+    >>> type(machine.memory).__name__
+    'array'
+    >>> machine.run()
+    [1219070632396864]
+    >>> machine = Machine([1102, 3491519200000, 3491519200000, 7, 4, 7, 99, 0], memory='array')
+    >>> machine.run()
+    [12190706323968640000000000]
+    >>> type(machine.memory).__name__
+    'list'
+
+    Paged memory only allocates the pages a program writes to,
+    which suits programs using far apart addresses. Like array-backed
+    memory, its pages store 64-bit integers, but only the pages holding
+    values that don't fit turn into lists:
+
+    >>> machine = Machine([21101, 7, 0, 1000000000, 204, 1000000000, 99], memory='paged')
+    >>> machine.run()
+    [7]
+    >>> machine.memory.pages_allocated
+    2
+    >>> machine = Machine([1102, 3491519200000, 3491519200000, 1000000000, 4, 1000000000, 99], memory='paged')
+    >>> machine.run()
+    [12190706323968640000000000]
+    >>> sorted(type(page).__name__ for page in machine.memory.pages.values())
+    ['array', 'list']
+
+    The program is copied into the machine's memory. With `copy=False`,
+    memory of the right kind, like the one `read_intcode_memory` returns,
+    becomes the machine's memory as it is:
+
+    >>> from array import array
+    >>> program = array('q', [1101, 2, 3, 0, 99])
+    >>> machine = Machine(program, memory='array', copy=False)
+    >>> machine.run(), program[0]
+    ([], 5)
+    """
+
+    __slots__ = (
+        'memory',
+        'pointer',
+        'relative_base',
+        'inputs',
+        'outputs',
+        'halted',
+        'decoded',
+        'engine',
+        'compiled',
+        'steps',
+    )
+
+    def __init__(
+        self,
+        intcode: Iterable[int],
+        input_values: Iterable[int] = (),
+        engine=execute,
+        memory: str = MEMORY_LIST,
+        copy: bool = True,
+    ):
+        self.memory = allocate(intcode, memory, copy)
+        self.pointer = 0
+        self.relative_base = 0
+        self.inputs = deque(input_values)
+        self.outputs = deque()
+        self.halted = False
+        self.decoded = {}
+        self.engine = engine
+        # Code the engine translated the program into, see `intcode.compiler`
+        # and `intcode.blocks`
+        self.compiled = None
+        # Number of instructions executed so far
+        self.steps = 0
+
+    def process(self) -> str:
+        """
+        Executes instructions until the machine outputs a value, halts,
+        or needs an input value that isn't available.
+
+        >>> machine = Machine([104, 1, 104, 2, 99])
+        >>> machine.process()
+        'output'
+        >>> machine.outputs, machine.halted
+        (deque([1]), False)
+        """
+        if self.halted:
+            return STATUS_HALTED
+
+        return self.engine(self, True)
+
+    def resume(self, on_output: Optional[Callable[[int], None]] = None, max_steps: Optional[int] = None) -> str:
+        """
+        Executes instructions until the machine halts or needs an input value
+        that isn't available, and returns which of the two happened.
+
+        Output values are collected in the machine's output queue,
+        or passed to `on_output` if a callback is given.
+
+        With `max_steps`, the machine stops after executing that many
+        instructions and returns STATUS_EXHAUSTED. Resuming it again
+        continues exactly where it stopped:
+
+        >>> machine = Machine([1101, 2, 0, 12, 1001, 12, -1, 12, 1005, 12, 4, 99, 0])
+        >>> machine.resume(max_steps=4), machine.steps, machine.memory[12]
+        ('exhausted', 4, 0)
+        >>> machine.resume(max_steps=4), machine.steps
+        ('halted', 6)
+
+        >>> machine = Machine([3, 9, 4, 9, 3, 9, 4, 9, 99, 0])
+        >>> machine.resume()
+        'blocked'
+        >>> machine.inputs.extend([4, 2])
+        >>> machine.resume(print)
+        4
+        2
+        'halted'
+        """
+        if self.halted:
+            return STATUS_HALTED
+
+        if max_steps is None:
+            return self.engine(self, False, on_output)
+
+        return self.engine(self, False, on_output, max_steps)
+
+    def stream(self) -> Iterator[int]:
+        """
+        Yields output values as the machine produces them. The generator
+        stops when the machine halts or needs an input value that isn't
+        available.
+
+        >>> machine = Machine([104, 1, 3, 7, 104, 2, 99, 0])
+        >>> list(machine.stream())
+        [1]
+        >>> machine.inputs.append(0)
+        >>> list(machine.stream())
+        [2]
+        """
+        while self.process() == STATUS_OUTPUT:
+            yield self.outputs.popleft()
+
+    def send(self, value: int):
+        """
+        Queues a value for the machine's next input instruction.
+        """
+        self.inputs.append(value)
+
+    def receive(self) -> Optional[int]:
+        """
+        Returns the machine's next output value, running it until it
+        produces one if none is queued. Returns None if the machine halts or
+        needs an input value that isn't available before it outputs anything.
+
+        >>> machine = Machine([3, 11, 1002, 11, 2, 11, 4, 11, 1105, 1, 0, 0])
+        >>> machine.send(21)
+        >>> machine.receive()
+        42
+        >>> machine.receive() is None
+        True
+        """
+        if not self.outputs:
+            self.process()
+
+        return self.outputs.popleft() if self.outputs else None
+
+    def connect(self, other: 'Machine'):
+        """
+        Feeds the values this machine outputs into the input queue of another
+        machine. Both share a single queue, so values are passed on
+        without being copied.
+
+        >>> doubler = Machine([3, 11, 1002, 11, 2, 11, 4, 11, 1105, 1, 0, 0])
+        >>> incrementer = Machine([3, 11, 1001, 11, 1, 11, 4, 11, 1105, 1, 0, 0])
+        >>> doubler.connect(incrementer)
+        >>> doubler.send(20)
+        >>> doubler.resume()
+        'blocked'
+        >>> incrementer.receive()
+        41
+        """
+        self.outputs = other.inputs
+
+    def fork(self) -> 'Machine':
+        """
+        Returns an independent copy of the machine in its current state.
+
+        Paged memory is shared between both machines until one of them writes
+        to a page. The copy gets its own input and output queues holding the
+        values queued so far, so it is not connected to other machines.
+
+        >>> machine = Machine([3, 11, 1002, 11, 2, 11, 4, 11, 1105, 1, 0, 0], memory='paged')
+        >>> machine.resume()
+        'blocked'
+        >>> fork = machine.fork()
+        >>> fork.send(5)
+        >>> machine.send(21)
+        >>> fork.receive(), machine.receive()
+        (10, 42)
+        """
+        clone = Machine.__new__(Machine)
+        clone.memory = fork_memory(self.memory)
+        clone.pointer = self.pointer
+        clone.relative_base = self.relative_base
+        clone.inputs = deque(self.inputs)
+        clone.outputs = deque(self.outputs)
+        clone.halted = self.halted
+        clone.decoded = dict(self.decoded)
+        clone.engine = self.engine
+        clone.steps = self.steps
+        # The copy may change its code independently, so it compiles anew
+        clone.compiled = None
+
+        return clone
+
+    def run(self) -> List[int]:
+        """
+        Executes instructions until the machine halts
+        and returns all values it output.
+        """
+        if self.resume() == STATUS_BLOCKED:
+            raise Exception('MISSING INPUT')
+
+        return list(self.outputs)
+
+    async def run_async(self, inputs: asyncio.Queue, outputs: asyncio.Queue, budget: int = SLICE_BUDGET):
+        """
+        Executes instructions in an asyncio event loop until the machine
+        halts. Input instructions wait for values from the `inputs` queue
+        once the machine's own input queue is empty, and each output value
+        is put to the `outputs` queue before the machine continues, so that
+        a bounded queue holds the machine back until its values are taken.
+
+        After `budget` instructions the machine lets other tasks run,
+        so that a busy machine doesn't starve the event loop.
+
+        >>> async def double(values):
+        ...     inputs, outputs = asyncio.Queue(), asyncio.Queue()
+        ...     machine = Machine([3, 12, 1002, 12, 2, 12, 4, 12, 1105, 1, 0, 99, 0])
+        ...     task = asyncio.ensure_future(machine.run_async(inputs, outputs, budget=2))
+        ...     doubled = []
+        ...     for value in values:
+        ...         await inputs.put(value)
+        ...         doubled.append(await outputs.get())
+        ...     task.cancel()
+        ...     return doubled
+        >>> asyncio.run(double([1, 2, 21]))
+        [2, 4, 42]
+
+        A machine counting up forever only runs ahead of its consumer by
+        as many values as the output queue holds:
+
+        >>> async def count(machine):
+        ...     outputs = asyncio.Queue(maxsize=1)
+        ...     task = asyncio.ensure_future(machine.run_async(asyncio.Queue(), outputs))
+        ...     counted = [await outputs.get() for _ in range(3)]
+        ...     await asyncio.sleep(0)
+        ...     task.cancel()
+        ...     return counted
+        >>> machine = Machine([1001, 9, 1, 9, 4, 9, 1105, 1, 0, 0])
+        >>> asyncio.run(count(machine)), machine.memory[9]
+        ([1, 2, 3], 5)
+        >>> asyncio.run(machine.run_async(asyncio.Queue(), asyncio.Queue(), budget=0))
+        Traceback (most recent call last):
+        ...
+        Exception: ('INVALID BUDGET', 0)
+        """
+        if budget < 1:
+            raise Exception('INVALID BUDGET', budget)
+
+        pending = []
+        remaining = budget
+
+        while True:
+            steps = self.steps
+            status = STATUS_HALTED if self.halted else self.engine(self, True, pending.append, remaining)
+            remaining -= self.steps - steps
+
+            if pending:
+                await outputs.put(pending.pop())
+
+            if status == STATUS_HALTED:
+                return
+            elif status == STATUS_BLOCKED:
+                self.inputs.append(await inputs.get())
+                remaining = budget
+            elif remaining <= 0:
+                # Let other tasks run
+                await asyncio.sleep(0)
+                remaining = budget
@@ -0,0 +1,304 @@
+from array import array
+from typing import Iterable, List
+
+from .instructions import MODE_IMMEDIATE, MODE_POSITION, MODE_RELATIVE
+
+
+MEMORY_LIST = 'list'
+MEMORY_ARRAY = 'array'
+MEMORY_PAGED = 'paged'
+
+PAGE_SIZE = 1024
+
+
+class PagedMemory:
+    """
+    Sparse memory made of fixed-size pages.
+
+    A page is allocated when one of its addresses is first written to.
+    Reading from an address on a page that was never written to returns 0
+    and doesn't allocate anything.
+
+    Pages store values as 64-bit integers. A page is turned into a list of
+    Python integers once a value written to it doesn't fit, while the
+    other pages stay compact:
+
+    >>> memory = PagedMemory([1, 2, 3], page_size=4)
+    >>> memory[5] = 2 ** 70
+    >>> memory[5], type(memory.pages[0]).__name__, type(memory.pages[1]).__name__
+    (1180591620717411303424, 'array', 'list')
+
+    >>> memory = PagedMemory([1, 2, 3], page_size=4)
+    >>> memory[2], memory[1000000]
+    (3, 0)
+    >>> memory.pages_allocated
+    1
+    >>> memory[1000000] = 7
+    >>> memory[1000000], memory.pages_allocated
+    (7, 2)
+
+    Forks share their pages with the original memory until one of them
+    writes to a page, which then gets copied (copy-on-write):
+
+    >>> fork = memory.fork()
+    >>> fork[2] = 30
+    >>> memory[2], fork[2], fork[1000000]
+    (3, 30, 7)
+    """
+
+    __slots__ = ('pages', 'page_size', 'shared')
+
+    def __init__(self, intcode: Iterable[int] = (), page_size: int = PAGE_SIZE):
+        self.pages = {}
+        self.page_size = page_size
+        # Indices of pages that other memories may still reference
+        self.shared = set()
+
+        for address, value in enumerate(intcode):
+            if value != 0:
+                self[address] = value
+
+    def __getitem__(self, address: int) -> int:
+        page = self.pages.get(address // self.page_size)
+
+        if page is None:
+            return 0
+
+        return page[address % self.page_size]
+
+    def __setitem__(self, address: int, value: int):
+        page_index, offset = divmod(address, self.page_size)
+        page = self.pages.get(page_index)
+
+        if page is None:
+            if address < 0:
+                raise Exception('INVALID ADDRESS')
+
+            page = self.pages[page_index] = array('q', [0]) * self.page_size
+        elif page_index in self.shared:
+            page = self.pages[page_index] = copy_page(page)
+            self.shared.discard(page_index)
+
+        try:
+            page[offset] = value
+        except OverflowError:
+            # The value doesn't fit into 64 bits
+            page = self.pages[page_index] = list(page)
+            page[offset] = value
+
+    def load_page(self, page_index: int, values: List[int]):
+        """
+        Replaces a page with the given values, followed by zeros.
+        Pages of zeros aren't allocated.
+
+        >>> memory = PagedMemory(page_size=4)
+        >>> memory.load_page(1, [5, 6])
+        >>> memory.load_page(2, [0, 0, 0, 0])
+        >>> memory[4], memory[5], memory[6], memory.pages_allocated
+        (5, 6, 0, 1)
+        """
+        self.pages.pop(page_index, None)
+        self.shared.discard(page_index)
+
+        if not any(values):
+            return
+
+        try:
+            page = array('q', values)
+        except OverflowError:
+            # A value doesn't fit into 64 bits
+            page = list(values)
+
+        page.extend([0] * (self.page_size - len(values)))
+        self.pages[page_index] = page
+
+    def fork(self) -> 'PagedMemory':
+        """
+        Returns a copy of the memory that shares all pages with it
+        until they are written to.
+        """
+        clone = PagedMemory(page_size=self.page_size)
+        clone.pages = dict(self.pages)
+        clone.shared = set(self.pages)
+        self.shared = set(self.pages)
+
+        return clone
+
+    @property
+    def pages_allocated(self) -> int:
+        return len(self.pages)
+
+
+def copy_page(page):
+    """
+    Returns a writable copy of a page. Pages of mapped binary programs are
+    read-only views of the file, see `intcode.binary`.
+    """
+    if isinstance(page, memoryview):
+        return array('q', page.tobytes())
+
+    return page[:]
+
+
+def allocate(intcode: Iterable[int], kind: str = MEMORY_LIST, copy: bool = True):
+    """
+    Creates the memory of a machine holding a copy of the program.
+    Without `copy`, memory that already is of the given kind is used as
+    it is, and so is a list for array-backed memory, which turns into a
+    list anyway once a value doesn't fit.
+
+    Array-backed memory stores values as 64-bit integers. Programs holding
+    values that don't fit get list-backed memory instead.
+
+    >>> allocate([1, 0, 0, 3, 99], MEMORY_ARRAY)
+    array('q', [1, 0, 0, 3, 99])
+    >>> allocate([104, 1125899906842624000000, 99], MEMORY_ARRAY)
+    [104, 1125899906842624000000, 99]
+    >>> allocate([1, 0, 0, 3, 99], MEMORY_PAGED).pages_allocated
+    1
+
+    >>> program = array('q', [1, 0, 0, 3, 99])
+    >>> allocate(program, MEMORY_ARRAY, copy=False) is program
+    True
+
+    Paged memory, like a mapped binary program, is forked instead of
+    copied, so that machines share its pages until they write to them.
+    """
+    if isinstance(intcode, PagedMemory):
+        if kind != MEMORY_PAGED:
+            raise Exception('INVALID MEMORY KIND', kind)
+
+        return intcode if not copy else intcode.fork()
+
+    if not copy:
+        if type(intcode) is list and kind in (MEMORY_LIST, MEMORY_ARRAY):
+            return intcode
+        elif isinstance(intcode, array) and intcode.typecode == 'q' and kind == MEMORY_ARRAY:
+            return intcode
+
+    if kind == MEMORY_LIST:
+        return list(intcode)
+    elif kind == MEMORY_ARRAY:
+        try:
+            return array('q', intcode)
+        except OverflowError:
+            return list(intcode)
+    elif kind == MEMORY_PAGED:
+        return PagedMemory(intcode)
+    else:
+        raise Exception('INVALID MEMORY KIND', kind)
+
+
+def fork_memory(memory):
+    """
+    Returns a copy of a machine's memory. Paged memory is copied on write.
+
+    >>> fork_memory([1, 0, 0, 3, 99])
+    [1, 0, 0, 3, 99]
+    """
+    if isinstance(memory, PagedMemory):
+        return memory.fork()
+
+    return memory[:]
+
+
+def read(memory: List[int], index: int, param_mode: int, rel_base: int = 0) -> int:
+    """
+    Reads a value from memory according to its parameter mode.
+
+    Possible parameter modes are:
+
+    - MODE_POSITION: return the value at address `index`
+    - MODE_IMMEDIATE: return the value of `index` itself
+    - MODE_RELATIVE: return the value at address `index + rel_base`
+
+    >>> read([1002, 4, 3, 4, 33], 3, 0)
+    4
+    >>> read([1002, 4, 3, 4, 33], 4, 0)
+    33
+    >>> read([3, 0, 4, 0, 99], 0, 0)
+    3
+
+    >>> read([1002, 4, 3, 4, 33], 3, 1)
+    3
+    >>> read([1002, 4, 3, 4, 33], 5000, 1)
+    5000
+
+    >>> read([3, 0, 4, 0, 99], 0, 2, 0) # read from memory address 0 + 0
+    3
+    >>> read([3, 0, 4, 0, 99], 0, 2, 1) # read from memory address 0 + 1
+    0
+    >>> read([3, 0, 4, 0, 99], 0, 2, 2) # read from memory address 0 + 2
+    4
+    >>> read([3, 0, 4, 0, 99], 3, 2, 1) # read from memory address 3 + 1
+    99
+
+    >>> read([3, 0, 4, 0, 99], 5, 0) # read from new memory address 5
+    0
+    >>> read([3, 0, 4, 0, 99], 4, 2, 1) # read from new memory address 4 + 1
+    0
+    """
+    if param_mode == MODE_POSITION:
+        extend_memory(memory, index)
+        return memory[index]
+    elif param_mode == MODE_IMMEDIATE:
+        return index
+    elif param_mode == MODE_RELATIVE:
+        extend_memory(memory, rel_base + index)
+        return memory[rel_base + index]
+    else:
+        raise Exception('INVALID READ MODE', param_mode)
+
+
+def write(memory, index, param_mode, rel_base, value, decoded=None):
+    """
+    Writes a value to memory according to its parameter mode.
+
+    If a cache of decoded instructions is passed, the entry for the written
+    address is dropped so that self-modifying programs are decoded again.
+
+    >>> memory = [1002, 4, 3, 4, 33]
+    >>> decoded = {0: (2, (0, 1, 0))}
+    >>> write(memory, 0, 0, 0, 1101, decoded)
+    >>> memory, decoded
+    ([1101, 4, 3, 4, 33], {})
+    """
+    address = resolve_address(memory, index, param_mode, rel_base)
+    memory[address] = value
+
+    if decoded is not None:
+        decoded.pop(address, None)
+
+
+def resolve_address(memory, index, param_mode, rel_base) -> int:
+    """
+    Returns the memory address a write parameter refers to
+    and makes sure the memory is large enough to hold it.
+
+    >>> resolve_address([3, 0, 4, 0, 99], 7, 0, 0)
+    7
+    >>> resolve_address([3, 0, 4, 0, 99], 7, 2, 3)
+    10
+    """
+    if param_mode == MODE_POSITION:
+        address = index
+    elif param_mode == MODE_RELATIVE:
+        address = rel_base + index
+    else:
+        raise Exception('INVALID WRITE MODE', param_mode)
+
+    extend_memory(memory, address)
+
+    return address
+
+
+def extend_memory(memory, target_index):
+    if target_index < 0:
+        raise Exception('INVALID ADDRESS')
+
+    if isinstance(memory, PagedMemory):
+        # Paged memory allocates pages on first write
+        return
+
+    if target_index >= len(memory):
+        memory.extend([0] * (target_index - len(memory) + 1))
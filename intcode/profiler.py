@@ -0,0 +1,160 @@
+"""
+Profiling of Intcode programs.
+
+A profile provides an engine executing instructions one by one like
+`execute_table` while recording what they do. Machines only pay for it if
+they are created with the profile's engine, other engines are unaffected:
+
+    profile = Profile()
+    Machine(intcode, [2], engine=profile.execute).run()
+    print(profile.report())
+"""
+from collections import Counter
+from typing import Callable, Optional
+import json
+import time
+
+from .engines import STATUS_BLOCKED, STATUS_EXHAUSTED, STATUS_HALTED, step
+from .instructions import OPCODE_NAMES, decode
+from .memory import PagedMemory
+
+
+class Profile:
+    """
+    Statistics about the instructions executed by the machines using the
+    profile's engine: how often each opcode was executed, how often each
+    address was executed, the highest number of memory cells the machine
+    used and the wall time spent executing.
+
+    >>> from intcode import Machine
+    >>> profile = Profile()
+    >>> Machine([1101, 2, 3, 9, 4, 9, 99], engine=profile.execute).run()
+    [5]
+    >>> profile.instructions, dict(profile.opcodes), profile.memory_high_water_mark
+    (3, {1: 1, 4: 1, 99: 1}, 10)
+    """
+
+    def __init__(self):
+        self.opcodes = Counter()
+        self.addresses = Counter()
+        self.memory_high_water_mark = 0
+        self.wall_time = 0.0
+
+    @property
+    def instructions(self) -> int:
+        return sum(self.opcodes.values())
+
+    def execute(
+        self,
+        machine,
+        pause_on_output: bool = False,
+        on_output: Optional[Callable[[int], None]] = None,
+        max_steps: Optional[int] = None,
+    ) -> str:
+        """
+        Executes the machine's instructions like `execute_table`
+        and records them in the profile.
+        """
+        opcodes = self.opcodes
+        addresses = self.addresses
+        started = time.perf_counter()
+        steps = 0
+
+        try:
+            while not machine.halted:
+                if steps == max_steps:
+                    return STATUS_EXHAUSTED
+
+                pointer = machine.pointer
+
+                try:
+                    opcode = decode(machine.memory[pointer])[0]
+                except IndexError:
+                    # Memory beyond the program is initialized with 0
+                    opcode = 0
+
+                status = step(machine, pause_on_output, on_output)
+
+                if status != STATUS_BLOCKED:
+                    opcodes[opcode] += 1
+                    addresses[pointer] += 1
+                    steps += 1
+
+                size = memory_size(machine.memory)
+                if size > self.memory_high_water_mark:
+                    self.memory_high_water_mark = size
+
+                if status is not None:
+                    return status
+
+            return STATUS_HALTED
+        finally:
+            self.wall_time += time.perf_counter() - started
+            machine.steps += steps
+
+    def to_dict(self, hottest: int = 10) -> dict:
+        """
+        Returns the profile as a dictionary with the `hottest` most
+        executed addresses.
+        """
+        return {
+            'instructions': self.instructions,
+            'wall_time': self.wall_time,
+            'instructions_per_second': self.instructions / self.wall_time if self.wall_time else None,
+            'memory_high_water_mark': self.memory_high_water_mark,
+            'opcodes': {OPCODE_NAMES.get(opcode, str(opcode)): count for opcode, count in self.opcodes.most_common()},
+            'addresses': {str(address): count for address, count in self.addresses.most_common(hottest)},
+        }
+
+    def to_json(self, hottest: int = 10) -> str:
+        return json.dumps(self.to_dict(hottest), indent=2)
+
+    def report(self, hottest: int = 10) -> str:
+        """
+        Returns the profile as human-readable text.
+
+        >>> from intcode import Machine
+        >>> profile = Profile()
+        >>> Machine([1101, 2, 3, 9, 4, 9, 99], engine=profile.execute).run()
+        [5]
+        >>> print(profile.report(hottest=2))  # doctest: +ELLIPSIS
+        instructions: 3
+        wall time: ...s (... instructions/s)
+        memory high-water mark: 10
+        opcodes:
+          add                     1  33.3%
+          output                  1  33.3%
+          halt                    1  33.3%
+        hottest addresses:
+          0                       1  33.3%
+          4                       1  33.3%
+        """
+        instructions = self.instructions
+        per_second = instructions / self.wall_time if self.wall_time else 0
+        lines = [
+            'instructions: {}'.format(instructions),
+            'wall time: {:.6f}s ({:.0f} instructions/s)'.format(self.wall_time, per_second),
+            'memory high-water mark: {}'.format(self.memory_high_water_mark),
+            'opcodes:',
+        ]
+
+        for opcode, count in self.opcodes.most_common():
+            name = OPCODE_NAMES.get(opcode, str(opcode))
+            lines.append('  {:<16} {:>8} {:>6.1%}'.format(name, count, count / instructions))
+
+        lines.append('hottest addresses:')
+
+        for address, count in self.addresses.most_common(hottest):
+            lines.append('  {:<16} {:>8} {:>6.1%}'.format(address, count, count / instructions))
+
+        return '\n'.join(lines)
+
+
+def memory_size(memory) -> int:
+    """
+    Returns the number of memory cells allocated.
+    """
+    if isinstance(memory, PagedMemory):
+        return memory.pages_allocated * memory.page_size
+
+    return len(memory)
@@ -0,0 +1,186 @@
+"""
+Scheduling of networks of Intcode machines.
+
+A scheduler runs each machine until it halts or needs an input value that
+isn't available. Output values are delivered to the input queues of the
+machines connected to the one producing them. Only machines that received
+input since they last ran are run again, so the work done is proportional
+to the values sent around rather than to the number of machines.
+
+With a time slice, machines are preempted after executing that many
+instructions and queued again behind the other machines ready to run, so
+that busy machines take turns fairly. Machines can be given a quota of
+instructions they may execute in total, after which they aren't run again.
+"""
+from collections import deque
+from typing import Callable, List, Optional
+import weakref
+
+from .engines import STATUS_BLOCKED, STATUS_EXHAUSTED, STATUS_HALTED
+from .machine import Machine
+
+
+class Scheduler:
+    """
+    Runs a network of machines until all of them halted, or the ones that
+    haven't wait for input nobody sends (deadlock).
+
+    >>> doubler = Machine([3, 11, 1002, 11, 2, 11, 4, 11, 1105, 1, 0, 0])
+    >>> incrementer = Machine([3, 11, 1001, 11, 1, 11, 4, 11, 1105, 1, 0, 0])
+    >>> scheduler = Scheduler()
+    >>> scheduler.add(doubler)
+    >>> scheduler.add(incrementer)
+    >>> scheduler.connect(doubler, incrementer)
+    >>> scheduler.send(doubler, 20)
+    >>> scheduler.run()
+    'blocked'
+    >>> incrementer.outputs
+    deque([41])
+
+    Machines only run again once they received input. In a chain of 100
+    machines passing a value on, which are started in reverse order, each
+    machine blocks when it's started and runs once more when the value
+    reaches it:
+
+    >>> chain = [Machine([3, 9, 1001, 9, 1, 9, 4, 9, 99, 0]) for _ in range(100)]
+    >>> scheduler = Scheduler()
+    >>> for machine in reversed(chain):
+    ...     scheduler.add(machine)
+    >>> for machine, successor in zip(chain, chain[1:]):
+    ...     scheduler.connect(machine, successor)
+    >>> scheduler.send(chain[0], 0)
+    >>> scheduler.run(), chain[-1].outputs, scheduler.runs
+    ('halted', deque([100]), 199)
+
+    A machine that never stops doesn't hold up the others if the scheduler
+    has a time slice, and is stopped once it used up its quota:
+
+    >>> looping = Machine([1105, 1, 0])
+    >>> scheduler = Scheduler(time_slice=100)
+    >>> scheduler.add(looping, quota=1000)
+    >>> scheduler.add(doubler)
+    >>> scheduler.send(doubler, 50)
+    >>> scheduler.run(), doubler.outputs, looping.steps
+    ('exhausted', deque([100]), 1000)
+    """
+
+    def __init__(self, time_slice: Optional[int] = None):
+        self.time_slice = time_slice
+        self.machines = []
+        self.destinations = {}
+        self.handlers = {}
+        self.quotas = {}
+        # Machines to run next, and the same machines as set
+        self.ready = deque()
+        self.queued = set()
+        # Number of times a machine was run
+        self.runs = 0
+
+    def add(self, machine: Machine, on_output: Optional[Callable[[int], None]] = None, quota: Optional[int] = None):
+        """
+        Adds a machine to the network. Its output values are passed to
+        `on_output` if given, to the machines it gets connected to, or
+        else collected in its output queue. With `quota`, the machine is
+        only run until its step counter reaches it.
+        """
+        self.machines.append(machine)
+        self.handlers[machine] = on_output
+        self.quotas[machine] = quota
+        self.wake(machine)
+
+    def connect(self, source: Machine, destination: Machine):
+        """
+        Sends the values `source` outputs to `destination`. A machine can
+        be connected to several destinations, which all receive its values.
+        """
+        destinations = self.destinations.get(source)
+
+        if destinations is None:
+            destinations = self.destinations[source] = []
+            # The handler is stored on the scheduler, so it must not keep the
+            # scheduler alive, or finished networks would only be freed by
+            # the cyclic garbage collector
+            send = weakref.WeakMethod(self.send)
+
+            def deliver(value: int):
+                for destination in destinations:
+                    send()(destination, value)
+
+            self.handlers[source] = deliver
+
+        destinations.append(destination)
+
+    def send(self, machine: Machine, value: int):
+        """
+        Queues a value for a machine's next input instruction
+        and schedules the machine to run.
+        """
+        machine.inputs.append(value)
+        self.wake(machine)
+
+    def wake(self, machine: Machine):
+        if machine not in self.queued and not machine.halted and self.remaining(machine) != 0:
+            self.queued.add(machine)
+            self.ready.append(machine)
+
+    def remaining(self, machine: Machine) -> Optional[int]:
+        """
+        Returns how many more instructions the machine may execute,
+        or None if it has no quota.
+        """
+        quota = self.quotas[machine]
+
+        if quota is None:
+            return None
+
+        return max(quota - machine.steps, 0)
+
+    def run(self) -> str:
+        """
+        Runs machines until none can make progress. Returns STATUS_HALTED if
+        all machines halted, STATUS_EXHAUSTED if any machine used up its
+        quota, otherwise STATUS_BLOCKED.
+        """
+        ready = self.ready
+        queued = self.queued
+        handlers = self.handlers
+        time_slice = self.time_slice
+
+        while ready:
+            machine = ready.popleft()
+            queued.discard(machine)
+            self.runs += 1
+
+            budget = self.remaining(machine)
+            if time_slice is not None:
+                budget = time_slice if budget is None else min(budget, time_slice)
+
+            if machine.resume(handlers[machine], budget) == STATUS_EXHAUSTED:
+                # Let the other machines ready to run go first
+                self.wake(machine)
+
+        if all(machine.halted for machine in self.machines):
+            return STATUS_HALTED
+
+        if any(self.remaining(machine) == 0 for machine in self.machines if not machine.halted):
+            return STATUS_EXHAUSTED
+
+        return STATUS_BLOCKED
+
+    def blocked(self) -> List[Machine]:
+        """
+        Returns the machines waiting for input: the ones that haven't
+        halted, aren't ready to run and have instructions left to execute.
+
+        >>> looping = Machine([1105, 1, 0])
+        >>> waiting = Machine([3, 0, 99])
+        >>> scheduler = Scheduler(time_slice=100)
+        >>> scheduler.add(looping, quota=1000)
+        >>> scheduler.add(waiting)
+        >>> scheduler.run(), scheduler.blocked() == [waiting]
+        ('exhausted', True)
+        """
+        return [
+            machine for machine in self.machines
+            if not machine.halted and machine not in self.queued and self.remaining(machine) != 0
+        ]
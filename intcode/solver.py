@@ -0,0 +1,276 @@
+"""
+Symbolic execution of straight-line Intcode programs.
+
+Programs made of additions and multiplications only, like the ones of day 2,
+compute each memory value as a polynomial in their initial memory values.
+Executing them once with symbolic inputs gives that polynomial, which can
+then be solved instead of running the program for every candidate input.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .instructions import (
+    OPCODE_ADD,
+    OPCODE_HALT,
+    OPCODE_MULTIPLY,
+    MODE_IMMEDIATE,
+    MODE_POSITION,
+    decode,
+)
+
+
+class SymbolicExecutionError(Exception):
+    """
+    Raised for programs whose control flow or addressing depends on
+    symbolic values, or which use instructions other than add and multiply.
+    """
+
+
+class Polynomial:
+    """
+    A polynomial with integer coefficients. Terms map monomials, given as
+    sorted tuples of variable names, to their coefficients.
+
+    >>> noun, verb = Polynomial.variable('noun'), Polynomial.variable('verb')
+    >>> 3 * noun * noun + verb + 2
+    3*noun*noun + verb + 2
+    >>> (noun + 1) * (verb + 1)
+    noun*verb + noun + verb + 1
+    >>> (noun * 0 + 4)
+    4
+    """
+
+    __slots__ = ('terms',)
+
+    def __init__(self, terms: Dict[Tuple[str, ...], int]):
+        self.terms = {monomial: coefficient for monomial, coefficient in terms.items() if coefficient != 0}
+
+    @classmethod
+    def variable(cls, name: str) -> 'Polynomial':
+        return cls({(name,): 1})
+
+    def __add__(self, other: Union['Polynomial', int]) -> Union['Polynomial', int]:
+        terms = dict(self.terms)
+
+        for monomial, coefficient in as_terms(other).items():
+            terms[monomial] = terms.get(monomial, 0) + coefficient
+
+        return simplify(Polynomial(terms))
+
+    __radd__ = __add__
+
+    def __mul__(self, other: Union['Polynomial', int]) -> Union['Polynomial', int]:
+        terms = {}
+
+        for monomial_1, coefficient_1 in self.terms.items():
+            for monomial_2, coefficient_2 in as_terms(other).items():
+                monomial = tuple(sorted(monomial_1 + monomial_2))
+                terms[monomial] = terms.get(monomial, 0) + coefficient_1 * coefficient_2
+
+        return simplify(Polynomial(terms))
+
+    __rmul__ = __mul__
+
+    def degree(self) -> int:
+        return max((len(monomial) for monomial in self.terms), default=0)
+
+    def coefficient(self, *variables: str) -> int:
+        return self.terms.get(tuple(sorted(variables)), 0)
+
+    def evaluate(self, values: Dict[str, int]) -> int:
+        result = 0
+
+        for monomial, coefficient in self.terms.items():
+            for name in monomial:
+                coefficient *= values[name]
+
+            result += coefficient
+
+        return result
+
+    def __repr__(self) -> str:
+        parts = []
+
+        for monomial in sorted(self.terms, key=lambda monomial: (-len(monomial), monomial)):
+            coefficient = self.terms[monomial]
+
+            if not monomial:
+                parts.append(str(coefficient))
+            elif coefficient == 1:
+                parts.append('*'.join(monomial))
+            else:
+                parts.append('*'.join((str(coefficient),) + monomial))
+
+        return ' + '.join(parts) or '0'
+
+
+def as_terms(value: Union[Polynomial, int]) -> Dict[Tuple[str, ...], int]:
+    if isinstance(value, Polynomial):
+        return value.terms
+
+    return {(): value}
+
+
+def simplify(polynomial: Polynomial) -> Union[Polynomial, int]:
+    """
+    Turns polynomials without variables back into plain integers.
+    """
+    if all(monomial == () for monomial in polynomial.terms):
+        return polynomial.terms.get((), 0)
+
+    return polynomial
+
+
+# Value read from an address that depends on symbolic values. It may still
+# be overwritten before anything uses it.
+UNKNOWN = 'unknown'
+
+
+def concrete(value, what: str) -> int:
+    if isinstance(value, Polynomial) or value is UNKNOWN:
+        raise SymbolicExecutionError('SYMBOLIC ' + what, value)
+
+    return value
+
+
+def execute_symbolically(intcode: List[int], variables: Dict[int, str], max_steps: int = 100000) -> list:
+    """
+    Executes a program whose memory at the addresses in `variables` holds
+    the named variables, and returns its memory after it halted.
+
+    Values read through a symbolic address are UNKNOWN. The program can only
+    be executed as long as it doesn't use them as instructions or addresses.
+
+    >>> execute_symbolically([1, 9, 10, 0, 2, 0, 10, 0, 99, 3, 0], {10: 'verb'})
+    [verb*verb + 3*verb, 9, 10, 0, 2, 0, 10, 0, 99, 3, verb]
+    >>> execute_symbolically([1, 9, 10, 7, 2, 0, 0, 0, 99, 3, 0], {10: 'verb'})
+    Traceback (most recent call last):
+    ...
+    intcode.solver.SymbolicExecutionError: ('SYMBOLIC ADDRESS', verb + 3)
+    >>> execute_symbolically([1, 1, 2, 3, 1105, 1, 0, 99], {1: 'noun', 2: 'verb'})
+    Traceback (most recent call last):
+    ...
+    intcode.solver.SymbolicExecutionError: ('UNSUPPORTED INSTRUCTION', 5)
+
+    Like in a machine, memory beyond the program reads as 0 and grows when
+    written to, while negative addresses are invalid:
+
+    >>> execute_symbolically([1, 9, 0, 0, 1, 50, 9, 10, 99, 0], {9: 'verb'})
+    [verb + 1, 9, 0, 0, 1, 50, 9, 10, 99, verb, verb]
+    >>> execute_symbolically([1, -1, 0, 0, 99], {})
+    Traceback (most recent call last):
+    ...
+    intcode.solver.SymbolicExecutionError: ('INVALID ADDRESS', -1)
+    """
+    memory = [Polynomial.variable(variables[address]) if address in variables else value
+              for address, value in enumerate(intcode)]
+    pointer = 0
+
+    def load(address):
+        if address < 0:
+            raise SymbolicExecutionError('INVALID ADDRESS', address)
+
+        if address >= len(memory):
+            # Memory beyond the program is initialized with 0
+            return 0
+
+        return memory[address]
+
+    for _ in range(max_steps):
+        opcode, modes = decode(concrete(load(pointer), 'INSTRUCTION'))
+
+        if opcode == OPCODE_HALT:
+            return memory
+
+        if opcode not in (OPCODE_ADD, OPCODE_MULTIPLY):
+            raise SymbolicExecutionError('UNSUPPORTED INSTRUCTION', opcode)
+
+        operands = []
+        for offset, mode in zip((1, 2), modes):
+            parameter = load(pointer + offset)
+
+            if mode == MODE_IMMEDIATE:
+                operands.append(parameter)
+            elif mode != MODE_POSITION:
+                raise SymbolicExecutionError('UNSUPPORTED MODE', mode)
+            elif isinstance(parameter, Polynomial) or parameter is UNKNOWN:
+                operands.append(UNKNOWN)
+            else:
+                operands.append(load(parameter))
+
+        if modes[2] != MODE_POSITION:
+            raise SymbolicExecutionError('UNSUPPORTED MODE', modes[2])
+
+        address = concrete(load(pointer + 3), 'ADDRESS')
+
+        if address < 0:
+            raise SymbolicExecutionError('INVALID ADDRESS', address)
+
+        if address >= len(memory):
+            memory.extend([0] * (address - len(memory) + 1))
+
+        if UNKNOWN in operands:
+            memory[address] = UNKNOWN
+        elif opcode == OPCODE_ADD:
+            memory[address] = operands[0] + operands[1]
+        else:
+            memory[address] = operands[0] * operands[1]
+
+        pointer += 4
+
+    raise SymbolicExecutionError('STEP LIMIT EXCEEDED')
+
+
+def solve_noun_verb(
+    intcode: List[int],
+    target_output_value: int,
+    noun_range: Iterable[int] = range(100),
+    verb_range: Iterable[int] = range(100),
+) -> Optional[Tuple[int, int]]:
+    """
+    Finds the noun (address 1) and verb (address 2) for which the program
+    leaves `target_output_value` at address 0. Candidates are tried in the
+    same order as a brute-force search would, so the same pair is found.
+
+    Raises SymbolicExecutionError for programs that can't be executed
+    symbolically.
+
+    >>> solve_noun_verb([1, 0, 0, 0, 1, 1, 2, 0, 99], 30)
+    (0, 30)
+    >>> solve_noun_verb([1, 0, 0, 0, 2, 1, 2, 0, 99], 42)
+    (1, 42)
+    >>> solve_noun_verb([1, 0, 0, 0, 2, 1, 2, 0, 99], 10007) is None
+    True
+    """
+    noun_range, verb_range = list(noun_range), list(verb_range)
+    output = execute_symbolically(intcode, {1: 'noun', 2: 'verb'})[0]
+
+    if output is UNKNOWN:
+        raise SymbolicExecutionError('SYMBOLIC OUTPUT', output)
+
+    if not isinstance(output, Polynomial):
+        return (noun_range[0], verb_range[0]) if output == target_output_value and noun_range and verb_range else None
+
+    if output.degree() == 1:
+        # noun_factor * noun + verb_factor * verb + constant = target
+        noun_factor = output.coefficient('noun')
+        verb_factor = output.coefficient('verb')
+        constant = output.coefficient()
+        verbs = set(verb_range)
+
+        for noun in noun_range:
+            remainder = target_output_value - constant - noun_factor * noun
+
+            if verb_factor == 0:
+                if remainder == 0 and verb_range:
+                    return noun, verb_range[0]
+            elif remainder % verb_factor == 0 and remainder // verb_factor in verbs:
+                return noun, remainder // verb_factor
+
+        return None
+
+    for noun in noun_range:
+        for verb in verb_range:
+            if output.evaluate({'noun': noun, 'verb': verb}) == target_output_value:
+                return noun, verb
+
+    return None
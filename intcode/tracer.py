@@ -0,0 +1,173 @@
+"""
+Tracing of Intcode programs.
+
+A tracer provides an engine executing instructions one by one like
+`execute_table` while recording each of them in a ring buffer. The buffer
+holds the most recent `capacity` instructions only, so tracing takes the
+same amount of memory no matter how long a program runs:
+
+    tracer = Tracer(capacity=100000)
+    machine = Machine(intcode, [2], engine=tracer.execute)
+    machine.run()
+    print(tracer.format(last=20))
+    memory = tracer.memory_at(machine, step)
+
+Since every entry records the value an instruction overwrote, the memory
+as it was before any recorded instruction can be reconstructed from the
+machine's current memory by undoing the writes after it.
+"""
+from collections import deque
+from typing import Callable, Optional
+
+from .engines import STATUS_BLOCKED, STATUS_EXHAUSTED, STATUS_HALTED, INSTRUCTIONS, PARAM_WRITE, step
+from .instructions import MODE_POSITION, MODE_RELATIVE, OPCODE_NAMES, decode
+from .memory import PagedMemory, fork_memory, read
+
+
+class Tracer:
+    """
+    A ring buffer of the instructions executed by the machines using the
+    tracer's engine. Each entry is a tuple of the instruction's step number,
+    address, the relative base, the instruction (opcode and parameter
+    modes) and its raw parameters, and the address it wrote to with the
+    values there before and after, or None for instructions that don't
+    write.
+
+    >>> from intcode import Machine
+    >>> tracer = Tracer(capacity=3)
+    >>> machine = Machine([1101, 2, 3, 9, 1002, 9, 4, 9, 99, 0], engine=tracer.execute)
+    >>> machine.run(), machine.memory[9]
+    ([], 20)
+    >>> list(tracer.entries)
+    [(0, 0, 0, 1101, (2, 3, 9), 9, 0, 5), (1, 4, 0, 1002, (9, 4, 9), 9, 5, 20), (2, 8, 0, 99, (), None, None, None)]
+    >>> tracer.memory_at(machine, 1)[9]
+    5
+
+    Tracing doesn't change the machine, even when it blocks on input:
+
+    >>> machine = Machine([3, 1000, 99], engine=Tracer().execute)
+    >>> machine.run()
+    Traceback (most recent call last):
+    ...
+    Exception: MISSING INPUT
+    >>> len(machine.memory)
+    3
+    """
+
+    def __init__(self, capacity: int = 1000000):
+        self.entries = deque(maxlen=capacity)
+
+    def execute(
+        self,
+        machine,
+        pause_on_output: bool = False,
+        on_output: Optional[Callable[[int], None]] = None,
+        max_steps: Optional[int] = None,
+    ) -> str:
+        """
+        Executes the machine's instructions like `execute_table`
+        and records them in the ring buffer.
+        """
+        record = self.entries.append
+        steps = 0
+
+        try:
+            while not machine.halted:
+                if steps == max_steps:
+                    return STATUS_EXHAUSTED
+
+                memory = machine.memory
+                pointer = machine.pointer
+                relative_base = machine.relative_base
+                instruction = read(memory, pointer, MODE_POSITION)
+                opcode, modes = decode(instruction)
+                kinds = INSTRUCTIONS[opcode][1] if opcode in INSTRUCTIONS else ()
+                count = len(kinds)
+
+                if isinstance(memory, PagedMemory):
+                    parameters = tuple(memory[pointer + 1 + index] for index in range(count))
+                else:
+                    parameters = tuple(memory[pointer + 1:pointer + 1 + count])
+
+                    if len(parameters) < count:
+                        # Memory beyond the program is initialized with 0
+                        parameters += (0,) * (count - len(parameters))
+                address = old = None
+
+                if kinds and kinds[-1] == PARAM_WRITE:
+                    address = parameters[-1] + (relative_base if modes[count - 1] == MODE_RELATIVE else 0)
+
+                    if address >= 0:
+                        # Reading mustn't extend memory, the instruction may yet block
+                        old = memory[address] if isinstance(memory, PagedMemory) or address < len(memory) else 0
+
+                status = step(machine, pause_on_output, on_output)
+
+                if status == STATUS_BLOCKED:
+                    return status
+
+                new = None if address is None else machine.memory[address]
+                record((machine.steps + steps, pointer, relative_base, instruction, parameters, address, old, new))
+                steps += 1
+
+                if status is not None:
+                    return status
+
+            return STATUS_HALTED
+        finally:
+            machine.steps += steps
+
+    def memory_at(self, machine, step: int):
+        """
+        Returns a copy of the machine's memory as it was before the
+        recorded instruction with the step number `step` was executed.
+        The tracer must not have traced other machines since.
+        """
+        entries = self.entries
+
+        if not entries or not entries[0][0] <= step <= entries[-1][0] + 1:
+            raise Exception('STEP NOT RECORDED', step)
+
+        memory = fork_memory(machine.memory)
+
+        for entry in reversed(entries):
+            if entry[0] < step:
+                break
+
+            if entry[5] is not None:
+                memory[entry[5]] = entry[6]
+
+        return memory
+
+    def format(self, last: Optional[int] = None) -> str:
+        """
+        Returns the `last` recorded instructions, or all of them,
+        as human-readable text.
+
+        >>> from intcode import Machine
+        >>> tracer = Tracer()
+        >>> Machine([3, 7, 104, 5, 99, 0, 0, 0], [42], engine=tracer.execute).run()
+        [5]
+        >>> print(tracer.format())
+             0      0  input          3 7                  [7] 0 -> 42
+             1      2  output         104 5
+             2      4  halt           99
+        """
+        entries = self.entries
+
+        if last is not None:
+            entries = list(entries)[-last:]
+
+        lines = []
+
+        for step_number, pointer, relative_base, instruction, parameters, address, old, new in entries:
+            opcode = decode(instruction)[0]
+            line = '{:>6} {:>6}  {:<14} {:<20}'.format(
+                step_number, pointer, OPCODE_NAMES.get(opcode, str(opcode)), ' '.join(map(str, (instruction,) + parameters)))
+
+            if address is not None:
+                line += ' [{}] {} -> {}'.format(address, old, new)
+
+            lines.append(line.rstrip())
+
+        return '\n'.join(lines)